@@ -8,11 +8,13 @@ setup(
     version='0.3.1',
     author='Evan Zhang',
     install_requires=['pyyaml'],
+    extras_require={'numpy': ['numpy']},
     description='A testcase generator for creating testcases for online judges.',
     long_description=readme,
     long_description_content_type='text/markdown',
     url='https://github.com/Ninjaclasher/testcase-generator',
     packages=find_packages(),
+    python_requires='>=3.7',
     classifiers=[
         'Development Status :: 3 - Alpha',
         'Environment :: Console',
@@ -3,9 +3,16 @@
 
     Created by Evan Zhang (Ninjaclasher)
 """
+from testcase_generator.archive import ArchiveWriter
+from testcase_generator.cache import BuildCache
+from testcase_generator.exceptions import CaseGenerationError
+from testcase_generator.formatter import Lines
 from testcase_generator.generators import ArrayGenerator, GraphGenerator, StringGenerator
+from testcase_generator.journal import RunJournal
 from testcase_generator.models import (
-    BaseConstraint, Batch, BoundedConstraint, Case, ChoiceConstraint, CustomGeneratorConstraint, Generator,
-    NoArgumentConstraint,
+    BaseConstraint, Batch, BoundedConstraint, Case, CaseSpec, ChoiceConstraint, CustomGeneratorConstraint, Generator,
+    LazyCases, NoArgumentConstraint,
 )
 from testcase_generator.parser import ConstraintParser
+from testcase_generator.rng import NumpyRandom, derive_seed
+from testcase_generator.runner import RunResult, SolutionRunner
@@ -0,0 +1,88 @@
+import shutil
+import tarfile
+import threading
+import zipfile
+
+from testcase_generator.formatter import BUFFER_SIZE
+
+# compressions of tar archives, by the extension of the archive
+TAR_MODES = {
+    '.tar': '',
+    '.tar.gz': 'gz',
+    '.tgz': 'gz',
+    '.tar.bz2': 'bz2',
+    '.tar.xz': 'xz',
+}
+
+
+class ArchiveWriter:
+    # the same layout as CASES_DIR
+    NAME_FORMAT = 'batch{batch}/{case}.{ext}'
+
+    def __init__(self, filename, level=None, name_format=None, keep_files=True):
+        """
+        Writes the files of each case to a zip or tar archive as soon as they are complete.
+        filename: the archive, whose extension is one of .zip, .tar, .tar.gz, .tgz, .tar.bz2 or .tar.xz
+        level: the compression level, from 0 to 9, defaults to the default level of the compression
+        name_format: the name of each file in the archive, formatted with its batch number, case number and
+                     its extension, which is either in or out
+        keep_files: whether the files of a case are kept once they are added to the archive
+        """
+        self.filename = filename
+        self.name_format = name_format or self.NAME_FORMAT
+        self.keep_files = keep_files
+        self.error = None
+        # files are added from the threads of the solution runner
+        self._lock = threading.Lock()
+        self._zip = self._tar = None
+
+        if filename.endswith('.zip'):
+            kwargs = {} if level is None else {'compresslevel': level}
+            self._zip = zipfile.ZipFile(filename, 'w', zipfile.ZIP_DEFLATED, **kwargs)
+            return
+        for ext, compression in TAR_MODES.items():
+            if filename.endswith(ext):
+                break
+        else:
+            raise ValueError('Unknown archive type of {}.'.format(filename))
+        kwargs = {}
+        if level is not None and compression:
+            kwargs = {'preset': level} if compression == 'xz' else {'compresslevel': level}
+        self._tar = tarfile.open(filename, 'w:' + compression, **kwargs)
+
+    def name(self, batch, case, ext):
+        return self.name_format.format(batch=batch, case=case, ext=ext)
+
+    def add(self, batch, case, ext, filename):
+        name = self.name(batch, case, ext)
+        with self._lock, open(filename, 'rb') as f:
+            if self._zip is not None:
+                # the size is not known to the zip file up front, and may be above the zip64 limit
+                with self._zip.open(name, 'w', force_zip64=True) as out:
+                    shutil.copyfileobj(f, out, BUFFER_SIZE)
+            else:
+                info = self._tar.gettarinfo(fileobj=f, arcname=name)
+                info.uid = info.gid = 0
+                info.uname = info.gname = ''
+                self._tar.addfile(info, f)
+
+    def close(self):
+        """
+        Raises the first error from adding a file in the background, see Batch.archive_case.
+        """
+        if self._zip is not None:
+            self._zip.close()
+        else:
+            self._tar.close()
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            # the original error is more useful than one from adding a file
+            self.error = None
+        self.close()
+        return False
@@ -0,0 +1,95 @@
+import hashlib
+import inspect
+import json
+import os
+import shutil
+
+
+def _function_source(function):
+    try:
+        return inspect.getsource(function)
+    except (OSError, TypeError):
+        # functions defined in an interactive session have no source file
+        code = getattr(function, '__code__', None)
+        if code is None:
+            return repr(function)
+        return repr((code.co_code, code.co_consts, code.co_names))
+
+
+def _describe(constraint):
+    generator = constraint.generator
+    name = getattr(generator, '__qualname__', None) or type(generator).__qualname__
+    return '{}({!r}, {})'.format(type(constraint).__qualname__, constraint.args, name)
+
+
+def _hash(*parts):
+    return hashlib.sha256(json.dumps(parts, default=repr).encode()).hexdigest()
+
+
+def _file_hash(filename):
+    sha = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class BuildCache:
+    FILENAME = '.cache.json'
+
+    def __init__(self, filename, exe_args=None):
+        """
+        A manifest of the keys of the .in and .out files that were generated, so that the cases whose keys did
+        not change can be skipped.
+        filename: the file the manifest is stored in
+        exe_args: the arguments of the solution, whose files are part of the keys of the .out files
+        """
+        self.filename = filename
+        self.entries = {}
+        try:
+            with open(filename) as f:
+                self.entries = json.load(f).get('cases', {})
+        except (OSError, ValueError):
+            pass
+        self.exe_key = None if exe_args is None else self._exe_key(exe_args)
+
+    @staticmethod
+    def _exe_key(args):
+        files = []
+        for i, arg in enumerate(args):
+            path = arg if os.path.isfile(arg) else shutil.which(arg) if i == 0 else None
+            files.append(_file_hash(path) if path is not None else None)
+        return _hash(list(args), files)
+
+    @staticmethod
+    def input_key(case, batch_num, case_num, seed, random_class):
+        """
+        The key of the .in file of a case, which covers its constraints, the other attributes set by
+        SET_CONSTRAINTS, its seed, and the source of SET_CONSTRAINTS and SET_INPUT. Changes to other functions
+        that they call are not detected.
+        """
+        constraints = case.dict
+        attributes = sorted((name, repr(value)) for name, value in case._template.items() if name not in constraints)
+        constraints = sorted((name, _describe(value)) for name, value in constraints.items())
+        return _hash(batch_num, case_num, seed, random_class.__module__ + '.' + random_class.__qualname__,
+                     _function_source(type(case).SET_CONSTRAINTS), _function_source(case._set_input), constraints,
+                     attributes)
+
+    def output_key(self, input_key):
+        if self.exe_key is None:
+            return None
+        return _hash(input_key, self.exe_key)
+
+    def get(self, name):
+        return self.entries.get(name, {})
+
+    def set(self, name, input_key=None, output_key=None):
+        self.entries[name] = {'input': input_key, 'output': output_key}
+
+    def save(self):
+        # written to a temporary file first, so that an interrupted save does not lose the manifest
+        os.makedirs(os.path.dirname(self.filename) or '.', exist_ok=True)
+        temp = self.filename + '.tmp'
+        with open(temp, 'w') as f:
+            json.dump({'cases': self.entries}, f, indent=1, sort_keys=True)
+        os.replace(temp, self.filename)
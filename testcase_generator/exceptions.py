@@ -0,0 +1,9 @@
+class CaseGenerationError(Exception):
+    def __init__(self, batch, case, message):
+        super().__init__(batch, case, message)
+        self.batch = batch
+        self.case = case
+        self.message = message
+
+    def __str__(self):
+        return 'Batch {}, case {}: {}'.format(self.batch, self.case, self.message)
@@ -0,0 +1,69 @@
+import ast
+import functools
+import operator
+
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: None,
+}
+_UNARY_OPERATORS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+NAMES = ('MIN', 'MAX')
+# the largest result of a power, in bits, so that a config cannot make the parser hang
+MAX_POWER_BITS = 1 << 16
+
+
+def _power(base, exponent):
+    if isinstance(base, int) and isinstance(exponent, int) and exponent > 0 and \
+            base.bit_length() * exponent > MAX_POWER_BITS:
+        raise ValueError('{}**{} is too large.'.format(base, exponent))
+    return base ** exponent
+
+
+def _compile(node, expression):
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        value = node.value
+        return lambda names: value
+    if hasattr(ast, 'Num') and isinstance(node, ast.Num):  # pragma: no cover, Python < 3.8
+        value = node.n
+        return lambda names: value
+    if isinstance(node, ast.Name):
+        if node.id not in NAMES:
+            raise ValueError('Unknown name {} in {}.'.format(node.id, expression))
+        name = node.id
+        return lambda names: names[name]
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+        function = _BINARY_OPERATORS[type(node.op)] or _power
+        left = _compile(node.left, expression)
+        right = _compile(node.right, expression)
+        return lambda names: function(left(names), right(names))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPERATORS:
+        function = _UNARY_OPERATORS[type(node.op)]
+        operand = _compile(node.operand, expression)
+        return lambda names: function(operand(names))
+    raise ValueError('Unsupported expression {}.'.format(expression))
+
+
+@functools.lru_cache(maxsize=None)
+def compile_expression(expression):
+    """
+    Compiles a bound expression into a function that takes a dict with the values of MIN and MAX.
+    Only numbers, MIN, MAX, parentheses and the +, -, *, /, //, % and ** operators are allowed, so a config
+    cannot run arbitrary code. Every distinct expression is only compiled once.
+    """
+    try:
+        tree = ast.parse(expression, mode='eval')
+    except SyntaxError:
+        raise ValueError('Invalid expression {}.'.format(expression)) from None
+    return _compile(tree.body, expression)
+
+
+def evaluate(expression, _min, _max):
+    return compile_expression(expression.strip())({'MIN': _min, 'MAX': _max})
@@ -0,0 +1,103 @@
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# buffer size used for the .in files and the pipes into the solution
+BUFFER_SIZE = 1 << 20
+# the files of a case are written under this suffix and renamed once they are complete, so that an
+# interrupted run never leaves a partial file behind
+TEMP_SUFFIX = '.tmp'
+
+
+def _array_items(array):
+    # converting to Python objects first is much faster, and gives the same text for these dtypes
+    if array.dtype.kind in 'iub' or array.dtype == numpy.float64:
+        return array.tolist()
+    return array
+
+
+def _format_array(array):
+    return ' '.join(map(str, _array_items(array)))
+
+
+def format_line(line):
+    """
+    Formats a single value yielded from generate_input. Strings are written as is, other iterables are
+    space separated and everything else is converted with str.
+    """
+    cls = type(line)
+    if cls is str:
+        return line
+    if cls is int or cls is float:
+        return str(line)
+    if cls is list or cls is tuple:
+        return ' '.join(map(str, line))
+    if numpy is not None and cls is numpy.ndarray and line.ndim == 1:
+        return _format_array(line)
+
+    try:
+        iter(line)
+    except TypeError:
+        return str(line)
+    if isinstance(line, str):
+        return line
+    return ' '.join(map(str, line))
+
+
+class Lines:
+    def __init__(self, lines):
+        """
+        A block of lines that can be yielded from generate_input in one go.
+        Every element is formatted as if it was yielded on its own, so a list of tuples is written
+        as one tuple per line, and a 2-dimensional NumPy array as one row per line.
+        """
+        self.lines = lines
+
+    def format(self):
+        """
+        Returns the text of all the lines, each followed by a newline.
+        """
+        lines = self.lines
+        if numpy is not None and type(lines) is numpy.ndarray:
+            if lines.ndim == 1:
+                lines = list(map(str, _array_items(lines)))
+            else:
+                lines = [' '.join(map(str, row)) for row in _array_items(lines)]
+        else:
+            lines = list(map(format_line, lines))
+        if not lines:
+            return ''
+        return '\n'.join(lines) + '\n'
+
+
+class LineWriter:
+    def __init__(self, out, chunk_lines=4096):
+        """
+        Formats lines and writes them to out in large chunks.
+        flush() must be called once everything is written.
+        """
+        self.out = out
+        self.chunk_lines = chunk_lines
+        # the number of lines written so far
+        self.lines = 0
+        self._chunk = []
+
+    def write(self, line):
+        if type(line) is Lines:
+            self.flush()
+            text = line.format()
+            self.lines += text.count('\n')
+            self.out.write(text)
+            return
+        self._chunk.append(format_line(line))
+        if len(self._chunk) >= self.chunk_lines:
+            self.flush()
+
+    def flush(self):
+        if self._chunk:
+            text = '\n'.join(self._chunk) + '\n'
+            # a string may span several lines
+            self.lines += text.count('\n')
+            self.out.write(text)
+            self._chunk = []
@@ -1,6 +1,12 @@
-from collections import defaultdict
-
 from testcase_generator.generators.collection_generator import CollectionGenerator
+from testcase_generator.models import BoundedConstraint
+from testcase_generator.models.constraints import INT64_MAX, INT64_MIN
+from testcase_generator.sampling import sample_indices
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 class ArrayGenerator(CollectionGenerator):
@@ -17,16 +23,30 @@ class ArrayGenerator(CollectionGenerator):
                     distinct: distinct elements in the array. set V appropriately for a permutation
                     palindrome: palindromic array
             V: a ChoiceConstraint or BoundedConstraint object for the array values
+            numpy: generate the values with NumPy in one call, which returns a NumPy array instead of a list.
+                   Only used when V uses the default generator or random.uniform.
             additional arguments for the generator:
                     distinct: takes a value of "k" for number of times each element can occur (default is 1)
         """
+        self.numpy = kwargs.pop('numpy', False)
         super().__init__(N, *args, **kwargs)
+        self.numpy_random = None
+        if self.numpy:
+            self.numpy_random = numpy.random.default_rng(self.random.getrandbits(64))
+
+    def _validate(self):
+        super()._validate()
+        if self.numpy and numpy is None:
+            raise ValueError('NumPy is not installed.')
 
     def standard(self, length, **kwargs):
-        return [self.V.next for i in range(length)]
+        return self.V.next_many(length, numpy_random=self.numpy_random)
 
     def sorted(self, length, **kwargs):
-        return sorted(self.standard(length))
+        values = self.standard(length)
+        if self.numpy:
+            return numpy.sort(values)
+        return sorted(values)
 
     def distinct(self, length, **kwargs):
         k = kwargs.pop('k', 1)
@@ -34,23 +54,27 @@ class ArrayGenerator(CollectionGenerator):
         if num_values < length:
             raise ValueError('Impossible to generate.')
 
-        # not a lot of options, so just generate all of them and choose
-        if num_values <= length * 2:
-            possibilities = [val for val in self.V.choices for i in range(k)]
-            self.random.shuffle(possibilities)
-            return possibilities[:length]
-        else:
-            counter = defaultdict(int)
-
-            def get():
-                v = self.V.next
-                while counter[v] >= k:
-                    v = self.V.next
-                counter[v] += 1
-                return v
-            return [get() for i in range(length)]
+        # every value occupies k consecutive indices, so the index i corresponds to the value i // k
+        bounded = isinstance(self.V, BoundedConstraint)
+        fits = num_values <= INT64_MAX and (not bounded or INT64_MIN <= self.V.min <= self.V.max <= INT64_MAX)
+        if self.numpy and fits:
+            if num_values <= 2 * length:
+                indices = self.numpy_random.choice(num_values, size=length, replace=False)
+            else:
+                # numpy's choice shuffles a copy of the whole population for most sizes
+                indices = numpy.array(sample_indices(self.random, num_values, length), dtype=numpy.int64)
+            indices //= k
+            if bounded:
+                return indices + self.V.min
+            return numpy.array(list(self.V.choices))[indices]
+
+        return self.V.sample(length, k=k, rng=self.random)
 
     def palindrome(self, length, **kwargs):
+        if self.numpy:
+            # the first half includes the middle element
+            arr = numpy.asarray(self.standard(length - length // 2))
+            return numpy.concatenate((arr, arr[:length // 2][::-1]))
         arr = self.standard(length // 2)
         mid = [self.V.next] if length % 2 == 1 else []
         return arr + mid + arr[::-1]
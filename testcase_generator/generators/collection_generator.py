@@ -11,6 +11,10 @@ class CollectionGenerator(CustomGenerator):
         self.type = kwargs.pop('type', self.default_type)
         self.V = kwargs.pop('V', self.default_value_generator)
         super().__init__(N, *args, **kwargs)
+        if self.V is self.default_value_generator and self.V is not None:
+            # the default is shared by every generator, so it gets its own copy that uses this generator's random
+            self.V = self.V.copy()
+            self.V.set_random(self.random)
 
     def _validate(self):
         super()._validate()
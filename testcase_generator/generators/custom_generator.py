@@ -1,11 +1,15 @@
-from random import Random
+import random
 
 from testcase_generator.models import BoundedConstraint
 
 
 class CustomGenerator:
     def __init__(self, N, *args, **kwargs):
-        self.random = Random(kwargs.pop('seed', None))
+        seed = kwargs.pop('seed', None)
+        if seed is None:
+            # derive the seed from the global generator so that seeded runs are reproducible
+            seed = random.getrandbits(64)
+        self.random = random.Random(seed)
         self._N = N
         self.kwargs = kwargs
         self._validate()
@@ -1,9 +1,22 @@
-from collections import Counter
+import random
+from array import array
 
 from testcase_generator.generators.custom_generator import CustomGenerator
+from testcase_generator.models import BoundedConstraint, ChoiceConstraint
+from testcase_generator.models.constraints import INT64_MAX, INT64_MIN, random_method
+from testcase_generator.sampling import IndexPermutation, isqrt, mix, sample_indices, shuffled_indices
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 class GraphGenerator(CustomGenerator):
+    streaming_types = (3, 4, 10, 11, 12, 13, 14)
+    weight_types = ('random', 'shortest_path')
+    weight_chunk = 4096
+
     def __init__(self, N, type, *args, **kwargs):
         """
         N: a BoundedConstraint object or an integer for the number of nodes
@@ -17,42 +30,345 @@ class GraphGenerator(CustomGenerator):
                  12: tree, all nodes connected to one node
                  13: caterpillar tree
                  14: binary tree
+                 15: uniformly random tree
+                 16: tree with a given diameter
+                 17: tree with a given depth from its root, which is stored in root
+                 18: tree with a bounded maximum degree
         kwargs:
             M: number of edges, leave blank if it is a tree
             duplicates: allow for duplicate edges between nodes
             self_loops: allow for edges between the same node
+            diameter: the number of edges on the longest path of a type 16 tree
+            depth: the number of edges on the longest path from the root of a type 17 tree
+            max_degree: the maximum degree of a type 18 tree
+            W: a ChoiceConstraint or BoundedConstraint object for the edge weights, which makes the edges (u, v, w)
+               triples
+            weights: how the weights are given to the edges
+                    random: every weight is drawn from W independently (default)
+                    shortest_path: weights between W.min and W.max that grow with the square of the distance
+                                   between the nodes in a hidden order of the nodes. Shortest paths then take many
+                                   light edges, and the distance of a node improves about once for every neighbour
+                                   before it in the hidden order, which is the worst case of SPFA and of Dijkstra's
+                                   algorithm without a check for outdated heap entries.
+            streaming: compute each edge when it is requested instead of generating the whole graph up front,
+                       which only keeps the node permutation in memory. Supported for types 3, 4 and 10 to 14.
         """
         self.type = int(type)
         self.M = kwargs.pop('M', None)
         self.duplicates = kwargs.pop('duplicates', False)
         self.self_loops = kwargs.pop('self_loops', False)
+        self.streaming = kwargs.pop('streaming', False)
+        self.diameter = kwargs.pop('diameter', None)
+        self.depth = kwargs.pop('depth', None)
+        self.max_degree = kwargs.pop('max_degree', None)
+        self.W = kwargs.pop('W', None)
+        self.weights = kwargs.pop('weights', 'random')
+        self.root = None
         super().__init__(N, *args, **kwargs)
 
-        self.edges = Counter()
-        self.nodes = []
+        # the edges are stored in two parallel arrays, which take a few bytes per edge
+        self.typecode = 'i' if self.N < 2**31 else 'q'
+        self.us = array(self.typecode)
+        self.vs = array(self.typecode)
+        # the position of the parent of each node position in the spanning tree of a connected graph, which the
+        # remaining edges must not duplicate. The pair (a, b) with a < b is a tree edge if tree_parents[b] == a.
+        self.tree_parents = None
+        if self.type == 2 and not self.duplicates:
+            self.tree_parents = array(self.typecode, [-1]) * self.N
+        self.nodes = None
         self._generate_nodes()
-        self._generate_edges()
+        self.ws = None
+        # integer weights are stored compactly like the edges, other weights in a list
+        self.compact_weights = self._integer_weights() and (self.weights == 'shortest_path' or
+                                                            random_method(self.W.generator) is random.Random.randint)
+        if self.streaming:
+            self._prepare_stream()
+        else:
+            self._generate_edges()
+            if self.W is not None:
+                # every weight is drawn at once, after the edges so that they do not change the unweighted graph
+                self.ws = self._generate_weights()
 
     def _validate(self):
         super()._validate()
-        if self.type not in (1, 2, 3, 4, 10, 11, 12, 13, 14):
+        if self.type not in (1, 2, 3, 4, 10, 11, 12, 13, 14, 15, 16, 17, 18):
             raise ValueError('Unknown graph type {}.'.format(self.type))
+        for tree_type, name in ((16, 'diameter'), (17, 'depth'), (18, 'max_degree')):
+            if self.type == tree_type and getattr(self, name) is None:
+                raise ValueError('{} must be specified.'.format(name))
+        # longer paths do not fit, and shorter ones leave no node to attach the remaining nodes to
+        if self.type == 16 and not (min(2, self.N - 1) <= self.diameter <= self.N - 1):
+            raise ValueError('Impossible graph.')
+        if self.type == 17 and not (min(1, self.N - 1) <= self.depth <= self.N - 1):
+            raise ValueError('Impossible graph.')
+        if self.type == 18 and self.max_degree < min(2, self.N - 1):
+            raise ValueError('Impossible graph.')
         if self.M is None and self.type in (1, 2):
             raise ValueError('M must be specified.')
         if self.type == 2 and self.M < self.N - 1:
             raise ValueError('Impossible graph.')
-        if self.type == 3 and self.N > 10**4:
+        if self.type in (1, 2) and self.M > 0 and (self.pair_count == 0 or
+                                                   not self.duplicates and self.M > self.pair_count):
+            raise ValueError('Impossible graph.')
+        if self.type == 3 and self.N > 10**4 and not self.streaming:
             raise ValueError('Do you want me to TLE?')
+        if self.streaming and self.type not in self.streaming_types:
+            raise ValueError('Graph type {} cannot be streamed.'.format(self.type))
+        if self.weights not in self.weight_types:
+            raise ValueError('Unknown weights {}. Choices: {}'.format(self.weights, ', '.join(self.weight_types)))
+        if self.W is not None and not isinstance(self.W, ChoiceConstraint):
+            raise ValueError('W must be a ChoiceConstraint, not {}'.format(type(self.W).__name__))
+        if self.weights != 'random' and (self.W is None or self.streaming):
+            raise ValueError('{} weights require W and cannot be streamed.'.format(self.weights))
+        if self.weights == 'shortest_path' and not self._integer_weights():
+            raise ValueError('shortest_path weights require W to be a BoundedConstraint of 64-bit integers.')
+
+    def _integer_weights(self):
+        W = self.W
+        return (isinstance(W, BoundedConstraint) and isinstance(W.min, int) and isinstance(W.max, int) and
+                INT64_MIN <= W.min <= W.max <= INT64_MAX)
 
     def next(self):
         return self.next_edge()
 
     def next_edge(self):
-        try:
-            u, v = self.edges.pop()
-        except IndexError:
+        if self.streaming:
+            return self._next_stream_edge()
+        remaining = len(self.us)
+        if remaining == 0:
             return None
-        return (u, v) if self.random.randint(0, 1) else (v, u)
+        # pick a random remaining edge and move the last edge into its place
+        i = self.random.randrange(remaining)
+        u, v = self.us[i], self.vs[i]
+        self.us[i] = self.us[-1]
+        self.vs[i] = self.vs[-1]
+        self.us.pop()
+        self.vs.pop()
+        if self.ws is not None:
+            w = self.ws[i]
+            self.ws[i] = self.ws[-1]
+            self.ws.pop()
+            return (u, v, w) if self.random.getrandbits(1) else (v, u, w)
+        return (u, v) if self.random.getrandbits(1) else (v, u)
+
+    def _new_weights(self, values=()):
+        if self.compact_weights:
+            return array('q', values)
+        return list(values)
+
+    def _generate_weights(self):
+        W = self.W
+        count = len(self.us)
+        if self.weights == 'random':
+            return self._new_weights(W.next_many(count))
+
+        # the gap between the positions of the nodes of an edge in the hidden node order
+        positions = array(self.typecode, [0]) * (len(self.nodes) + 1)
+        for i in range(len(self.nodes) - 1, -1, -1):
+            positions[self.nodes[i]] = i
+        # a convex function of the gap, so that a path through closer nodes is shorter than a direct edge
+        low, span, max_gap = W.min, W.max - W.min, max(len(self.nodes) - 1, 1) ** 2
+        return self._new_weights(low + span * gap * gap // max_gap
+                                 for gap in (abs(positions[u] - positions[v]) for u, v in zip(self.us, self.vs)))
+
+    def _next_weight(self):
+        if not self._weight_buffer:
+            # drawn in chunks, as the number of edges that are requested is unknown
+            self._weight_buffer = self._new_weights(reversed(self.W.next_many(self.weight_chunk)))
+        return self._weight_buffer.pop()
+
+    def _check_numpy(self, as_numpy):
+        if as_numpy and numpy is None:
+            raise ValueError('NumPy is not installed.')
+
+    def _to_numpy(self, values):
+        if isinstance(values, array):
+            return numpy.frombuffer(values, dtype=numpy.dtype(values.typecode))
+        return numpy.array(values)
+
+    def edge_arrays(self, as_numpy=False):
+        """
+        Returns the remaining edges as two arrays us and vs, so that the i-th edge is (us[i], vs[i]), in a random
+        order and with a random orientation like next_edge. If W is set, the weights are returned in a third
+        array ws. The edges are removed from the generator.
+        as_numpy: return NumPy arrays instead of array.array objects
+        """
+        self._check_numpy(as_numpy)
+        weighted = self.W is not None
+        if self.streaming:
+            edges = (array(self.typecode), array(self.typecode), self._new_weights())
+            edge = self._next_stream_edge()
+            while edge is not None:
+                for values, value in zip(edges, edge):
+                    values.append(value)
+                edge = self._next_stream_edge()
+            edges = edges if weighted else edges[:2]
+            if as_numpy:
+                return tuple(map(self._to_numpy, edges))
+            return edges
+
+        edges = (self.us, self.vs, self.ws) if weighted else (self.us, self.vs)
+        self.us, self.vs = array(self.typecode), array(self.typecode)
+        self.ws = self._new_weights() if weighted else None
+        count = len(edges[0])
+        if as_numpy:
+            numpy_random = numpy.random.default_rng(self.random.getrandbits(64))
+            order = numpy_random.permutation(count)
+            edges = [self._to_numpy(values)[order] for values in edges]
+            us, vs = edges[0], edges[1]
+            flip = numpy_random.integers(0, 2, size=count, dtype=bool)
+            us[flip], vs[flip] = vs[flip], us[flip]
+            return tuple(edges)
+
+        order = list(range(count))
+        self.random.shuffle(order)
+        flips = format(self.random.getrandbits(count), '0{}b'.format(count)) if count else ''
+        us, vs = edges[0], edges[1]
+        result = (array(self.typecode, [vs[i] if flip == '1' else us[i] for i, flip in zip(order, flips)]),
+                  array(self.typecode, [us[i] if flip == '1' else vs[i] for i, flip in zip(order, flips)]))
+        if weighted:
+            ws = edges[2]
+            result += (self._new_weights(ws[i] for i in order),)
+        return result
+
+    def csr(self, as_numpy=False):
+        """
+        Returns the remaining edges as an adjacency structure in compressed sparse row form, a pair of arrays
+        offsets and targets, so that the neighbours of node x are targets[offsets[x - 1]:offsets[x]].
+        Every edge appears in the neighbours of both of its nodes, and the neighbours are in a random order.
+        If W is set, a third array holds the weight of each entry of targets.
+        The edges are removed from the generator.
+        as_numpy: return NumPy arrays instead of array.array objects
+        """
+        N = self.N
+        edges = self.edge_arrays(as_numpy)
+        us, vs = edges[0], edges[1]
+        if as_numpy:
+            nodes = numpy.concatenate((us, vs))
+            # a stable sort keeps the random order of the edges within each node
+            order = numpy.argsort(nodes, kind='stable')
+            result = (numpy.cumsum(numpy.bincount(nodes, minlength=N + 1)), numpy.concatenate((vs, us))[order])
+            if len(edges) == 3:
+                result += (numpy.concatenate((edges[2], edges[2]))[order],)
+            return result
+
+        # counting sort by node, the offsets are 64 bit as there can be more than 2**31 edges
+        offsets = array('q', [0]) * (N + 1)
+        for u in us:
+            offsets[u] += 1
+        for v in vs:
+            offsets[v] += 1
+        total = 0
+        for x in range(N + 1):
+            total += offsets[x]
+            offsets[x] = total
+        ends = array('q', offsets)
+        targets = array(self.typecode, [0]) * total
+        for u, v in zip(us, vs):
+            ends[u] -= 1
+            targets[ends[u]] = v
+            ends[v] -= 1
+            targets[ends[v]] = u
+        if len(edges) == 2:
+            return offsets, targets
+
+        ends = array('q', offsets)
+        weights = self._new_weights([0]) * total
+        for u, v, w in zip(us, vs, edges[2]):
+            ends[u] -= 1
+            weights[ends[u]] = w
+            ends[v] -= 1
+            weights[ends[v]] = w
+        return offsets, targets, weights
+
+    def parent_array(self, root=None, as_numpy=False):
+        """
+        Returns the parent of every node of a tree as an array p of length N + 1, where p[x] is the parent of
+        node x when the tree is rooted at root, and p[root] and p[0] are 0. The edges are removed from the
+        generator.
+        root: defaults to the root of a type 17 tree, or a random node for other trees
+        as_numpy: return a NumPy array instead of an array.array object
+        """
+        self._check_numpy(as_numpy)
+        N = self.N
+        if root is None:
+            root = self.root if self.root is not None else self.random.randint(1, N)
+        if not 1 <= root <= N:
+            raise ValueError('Unknown root {}.'.format(root))
+        offsets, targets = self.csr()[:2]
+        if len(targets) != 2 * (N - 1):
+            raise ValueError('The graph is not a tree.')
+
+        parents = array(self.typecode, [0]) * (N + 1)
+        visited = bytearray(N + 1)
+        visited[root] = 1
+        queue = array(self.typecode, [root])
+        for u in queue:
+            for i in range(offsets[u - 1], offsets[u]):
+                v = targets[i]
+                if not visited[v]:
+                    visited[v] = 1
+                    parents[v] = u
+                    queue.append(v)
+        if len(queue) != N:
+            raise ValueError('The graph is not a tree.')
+        if as_numpy:
+            return self._to_numpy(parents)
+        return parents
+
+    def _prepare_stream(self):
+        N = self.N
+        if self.type == 3:
+            self.edge_count = self.pair_count
+        elif self.type == 4:
+            self.edge_count = N
+        else:
+            self.edge_count = max(N - 1, 0)
+        # the edges are numbered, and emitted in the order of a random permutation of their numbers
+        self._order = IndexPermutation(self.edge_count, self.random)
+        self._position = 0
+        self._weight_buffer = None
+        # keys the hash that gives each edge number its own random bits
+        self._hash_key = self.random.getrandbits(64)
+        if self.type == 12:
+            self._special = self.random.randrange(N)
+        elif self.type == 13:
+            self._main_len = self.random.randint(N // 2, N - 1)
+
+    def _stream_edge(self, j, bits):
+        """
+        Returns edge number j of the graph, using bits as its random bits.
+        The edges match the ones from _generate_edges.
+        """
+        nodes = self.nodes
+        if self.type == 3:
+            a, b = self._pair(j)
+            return nodes[a], nodes[b]
+        elif self.type == 4:
+            return nodes[j], nodes[(j + 1) % len(nodes)]
+        elif self.type == 10 or (self.type == 13 and j < self._main_len):
+            return nodes[j], nodes[j + 1]
+        elif self.type in (11, 13):
+            i = j + 1
+            return nodes[bits % i], nodes[i]
+        elif self.type == 12:
+            special = self._special
+            return nodes[j + (j >= special)], nodes[special]
+        elif self.type == 14:
+            i = j + 2
+            return nodes[i - 1], nodes[i // 2 - 1]
+
+    def _next_stream_edge(self):
+        if self._position >= self.edge_count:
+            return None
+        j = self._order[self._position]
+        self._position += 1
+        bits = mix(j ^ self._hash_key)
+        u, v = self._stream_edge(j, bits >> 1)
+        if self.W is not None:
+            w = self._next_weight()
+            return (u, v, w) if bits & 1 else (v, u, w)
+        return (u, v) if bits & 1 else (v, u)
 
     @property
     def N(self):
@@ -65,46 +381,119 @@ class GraphGenerator(CustomGenerator):
         return self.random.choice(self.nodes)
 
     def _generate_nodes(self):
-        self.nodes = list(range(1, self.N + 1))
+        self.nodes = array(self.typecode, range(1, self.N + 1))
         self.random.shuffle(self.nodes)
 
-    def _clean(self, a, b):
-        return (a, b) if a < b else (b, a)
+    # the unordered pairs of node positions (a, b) with a < b, or a <= b if self loops are allowed, are numbered
+    # row by row, so that M distinct edges can be picked by sampling M distinct pair indices
+
+    @property
+    def pair_count(self):
+        N = self.N
+        return N * (N + 1) // 2 if self.self_loops else N * (N - 1) // 2
 
-    def _get_node_pair(self):
-        return self._node, self._node
+    def _pair_index(self, a, b):
+        if a > b:
+            a, b = b, a
+        return b * (b + 1) // 2 + a if self.self_loops else b * (b - 1) // 2 + a
 
-    def _validate_node_pair(self, a, b):
-        return (self.self_loops or a != b) and (self.duplicates or self.edges[self._clean(a, b)] == 0)
+    def _pair(self, index):
+        if self.self_loops:
+            b = (isqrt(8 * index + 1) - 1) // 2
+            return index - b * (b + 1) // 2, b
+        b = (isqrt(8 * index + 1) + 1) // 2
+        return index - b * (b - 1) // 2, b
 
-    def _get_pair(self):
-        a, b = self._get_node_pair()
-        while not self._validate_node_pair(a, b):
-            a, b = self._get_node_pair()
-        return a, b
+    def _add_pair(self, index):
+        a, b = self._pair(index)
+        self._add_edge(self.nodes[a], self.nodes[b])
 
     def _add_edge(self, a, b):
-        self.edges[self._clean(a, b)] += 1
+        self.us.append(a)
+        self.vs.append(b)
 
     def _generate_tree(self):
         for i in range(1, self.N):
             u = self.random.randint(0, i - 1)
             self._add_edge(self.nodes[u], self.nodes[i])
+            if self.tree_parents is not None:
+                self.tree_parents[i] = u
+
+    def _generate_prufer_tree(self, sequence):
+        """
+        Adds the edges of the tree with the given Prufer sequence of node positions, in O(N).
+        """
+        N = self.N
+        if N < 2:
+            return
+        degree = array(self.typecode, [1]) * N
+        for x in sequence:
+            degree[x] += 1
+        # ptr only moves forwards, and every leaf created behind it is used right away
+        ptr = 0
+        while degree[ptr] != 1:
+            ptr += 1
+        leaf = ptr
+        for v in sequence:
+            self._add_edge(self.nodes[leaf], self.nodes[v])
+            degree[v] -= 1
+            if degree[v] == 1 and v < ptr:
+                leaf = v
+            else:
+                ptr += 1
+                while degree[ptr] != 1:
+                    ptr += 1
+                leaf = ptr
+        self._add_edge(self.nodes[leaf], self.nodes[N - 1])
+
+    def _generate_path_tree(self, length, limits):
+        """
+        Adds a path of length edges through the first node positions, then attaches every other node to a random
+        node with a limit of at least 1. The limit of each node on the path is given by limits(i), and the limit of
+        an attached node is one less than the limit of its parent.
+        """
+        for i in range(length):
+            self._add_edge(self.nodes[i], self.nodes[i + 1])
+        limit = array(self.typecode, map(limits, range(length + 1)))
+        candidates = array(self.typecode, (i for i in range(length + 1) if limit[i] > 0))
+        randrange = self.random.randrange
+        for i in range(length + 1, self.N):
+            u = candidates[randrange(len(candidates))]
+            self._add_edge(self.nodes[u], self.nodes[i])
+            limit.append(limit[u] - 1)
+            if limit[i] > 0:
+                candidates.append(i)
+
+    def _generate_random_edges(self, count):
+        if self.duplicates:
+            randrange = self.random.randrange
+            pair_count = self.pair_count
+            for i in range(count):
+                self._add_pair(randrange(pair_count))
+        elif self.tree_parents is not None:
+            # skip the pairs that are already used, there are at most N - 1 of them
+            tree_parents = self.tree_parents
+            indices = shuffled_indices(self.random, self.pair_count)
+            while count > 0:
+                a, b = self._pair(next(indices))
+                if tree_parents[b] != a:
+                    self._add_edge(self.nodes[a], self.nodes[b])
+                    count -= 1
+        else:
+            for index in sample_indices(self.random, self.pair_count, count):
+                self._add_pair(index)
 
     def _generate_edges(self):
         N = self.N
 
         if self.type == 1:
-            for i in range(self.M):
-                self._add_edge(*self._get_pair())
+            self._generate_random_edges(self.M)
         elif self.type == 2:
             self._generate_tree()
-            for i in range(self.M - N + 1):
-                self._add_edge(*self._get_pair())
+            self._generate_random_edges(self.M - N + 1)
         elif self.type == 3:
-            for i, u in enumerate(self.nodes, not self.self_loops):
-                for v in self.nodes[i:]:
-                    self._add_edge(u, v)
+            for index in range(self.pair_count):
+                self._add_pair(index)
         elif self.type == 4:
             self.nodes.append(self.nodes[0])
             for i in range(self.N):
@@ -127,11 +516,24 @@ class GraphGenerator(CustomGenerator):
                 u = self.random.randint(0, i - 1)
                 self._add_edge(self.nodes[u], self.nodes[i])
         elif self.type == 14:
-            self.nodes = [0] + self.nodes
+            self.nodes = array(self.typecode, [0]) + self.nodes
             for i in range(2, self.N + 1):
                 self._add_edge(self.nodes[i], self.nodes[i // 2])
-        edges = []
-        for edge, cnt in self.edges.items():
-            edges += [edge] * cnt
-        self.edges = edges
-        self.random.shuffle(self.edges)
+        elif self.type == 15:
+            randrange = self.random.randrange
+            self._generate_prufer_tree([randrange(N) for i in range(N - 2)])
+        elif self.type == 16:
+            # a node at depth h below position j of the diameter path must have h <= min(j, diameter - j),
+            # so that no path through it is longer than the diameter
+            diameter = self.diameter
+            self._generate_path_tree(diameter, lambda j: min(j, diameter - j))
+        elif self.type == 17:
+            self.root = self.nodes[0]
+            depth = self.depth
+            self._generate_path_tree(depth, lambda j: depth - j)
+        elif self.type == 18:
+            # every node appears in the Prufer sequence one time less than its degree
+            k = self.max_degree - 1
+            self._generate_prufer_tree([i // k for i in sample_indices(self.random, N * k, N - 2)] if N > 2 else [])
+        # the edges are only picked at random from now on, so the tree used to reject duplicates can be freed
+        self.tree_parents = None
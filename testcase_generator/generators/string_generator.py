@@ -1,7 +1,10 @@
+import random
 import string
 
 from testcase_generator.generators.collection_generator import CollectionGenerator
 from testcase_generator.models import ChoiceConstraint
+from testcase_generator.models.constraints import random_method
+from testcase_generator.sampling import sample_indices
 
 
 class StringGenerator(CollectionGenerator):
@@ -19,35 +22,106 @@ class StringGenerator(CollectionGenerator):
                     space_separated: space separated "words"
                     repeating: string consisting of a substring that is repeated more than 1 time
             V: a ChoiceConstraint for the possible letters, the default is all lowercase letters
+            additional arguments for the generator:
+                    space_separated: takes a value of "min_word" and "max_word" for the minimum (default is 1)
+                                     and maximum (default is no limit) length of a word
         """
         super().__init__(N, *args, **kwargs)
 
     def next(self):
-        return ''.join(super().next())
+        value = super().next()
+        if isinstance(value, str):
+            return value
+        return ''.join(value)
 
     @property
     def _char(self):
         return self.V.next
 
+    def _byte_table(self):
+        """
+        Returns the translation table that maps random bytes to the characters of V, and the bytes that have to be
+        rejected to keep every character equally likely, or None if V cannot be generated from random bytes.
+        """
+        V = self.V
+        if random_method(V.generator) is not random.Random.choice:
+            return None
+        choices = V.choices
+        if not 0 < len(choices) <= 256 or not all(isinstance(c, str) and len(c) == 1 and ord(c) < 256
+                                                  for c in choices):
+            return None
+        k = len(choices)
+        limit = 256 - 256 % k
+        table = bytes.maketrans(bytes(range(limit)), bytes(ord(choices[i % k]) for i in range(limit)))
+        return table, bytes(range(limit, 256))
+
     def standard(self, length, **kwargs):
-        return [self._char for i in range(length)]
+        byte_table = self._byte_table()
+        if byte_table is None:
+            return ''.join(self.V.next_many(length))
+
+        # draws all the random bytes at once, and maps them to characters with bytes.translate
+        table, rejected = byte_table
+        rng = self.V.generator.__self__
+        parts = []
+        while length > 0:
+            count = length + length // 8 + 16
+            part = rng.getrandbits(8 * count).to_bytes(count, 'little').translate(table, rejected)[:length]
+            parts.append(part)
+            length -= len(part)
+        return b''.join(parts).decode('latin-1')
 
     def palindrome(self, length, **kwargs):
         chars = self.standard(length // 2)
-        mid = [self._char] if length % 2 == 1 else []
+        mid = self._char if length % 2 == 1 else ''
         return chars + mid + chars[::-1]
 
-    def space_separated(self, length, **kwargs):
-        num_spaces = self.random.randint(0, (length - 1) // 2)
-        chars = [[self._char] for i in range(num_spaces + 1)]
-        remaining_length = length - num_spaces - (num_spaces + 1)
-        for i in range(remaining_length):
-            chars[self.random.randint(0, num_spaces)].append(self._char)
-        return ' '.join(''.join(x) for x in chars)
+    def _word_lengths(self, length, min_word, max_word):
+        # w words take at least w * min_word + w - 1 and at most w * max_word + w - 1 characters
+        most_words = (length + 1) // (min_word + 1)
+        least_words = max(1, -(-(length + 1) // (max_word + 1))) if max_word is not None else 1
+        if min_word < 1 or max_word is not None and max_word < min_word or least_words > most_words:
+            raise ValueError('Impossible to generate.')
+        words = self.random.randint(least_words, most_words)
+        extra = length - (words - 1) - words * min_word
+
+        if max_word is None:
+            # stars and bars, the cut points split the extra letters into a uniformly random composition
+            cuts = sorted(sample_indices(self.random, extra + words - 1, words - 1))
+            ends = cuts + [extra + words - 1]
+            return [min_word + end - start - 1 for start, end in zip([-1] + cuts, ends)]
+
+        # the extra letters are spread evenly, then moved between random pairs of words, which keeps both the
+        # total and every length within the bounds
+        capacity = max_word - min_word
+        base, rest = divmod(extra, words)
+        lengths = [min_word + base] * words
+        for i in sample_indices(self.random, words, rest):
+            lengths[i] += 1
+        spread = max(0, min(base, capacity - base - 1))
+        if spread > 0:
+            order = list(range(words))
+            self.random.shuffle(order)
+            deltas = self.random.choices(range(-spread, spread + 1), k=words // 2)
+            for i, delta in enumerate(deltas):
+                lengths[order[2 * i]] += delta
+                lengths[order[2 * i + 1]] -= delta
+        return lengths
+
+    def space_separated(self, length, min_word=1, max_word=None, **kwargs):
+        lengths = self._word_lengths(length, min_word, max_word)
+        # the word lengths are fixed first, so all the letters can be generated at once
+        letters = self.standard(length - len(lengths) + 1)
+        words = []
+        start = 0
+        for word_length in lengths:
+            words.append(letters[start:start + word_length])
+            start += word_length
+        return ' '.join(words)
 
     def repeating(self, length, **kwargs):
         if length == 1:
-            return [self._char]
+            return self._char
         factors = set()
         for i in range(1, int(length**0.5) + 1):
             if length % i == 0:
@@ -0,0 +1,80 @@
+import json
+import os
+import threading
+
+
+class RunJournal:
+    # the journal is kept next to the cases directory, which only holds the cases
+    SUFFIX = '.journal'
+
+    def __init__(self, filename):
+        """
+        An append-only log of the cases completed by a run, from which an interrupted run can be resumed.
+        The first line describes the run, and every other line records that the .in or .out file of a case
+        was written.
+        filename: the file the journal is stored in
+        """
+        self.filename = filename
+        self.run = None
+        self.inputs = set()
+        self.outputs = set()
+        self._file = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        Reads the journal left by an earlier run, and returns the description of that run, or None if there is
+        none.
+        """
+        try:
+            with open(self.filename) as f:
+                lines = f.read().split('\n')
+            run = json.loads(lines[0])
+        except (OSError, ValueError):
+            return None
+        for line in lines[1:]:
+            try:
+                batch, case, stage = json.loads(line)
+            except (TypeError, ValueError):
+                # the last line is cut short if the run was killed while writing it
+                break
+            (self.inputs if stage == 'input' else self.outputs).add((batch, case))
+        self.run = run
+        return run
+
+    def start(self, run, resume=False):
+        """
+        Starts recording a run, described by a dict of its seed and such. When resuming a run with the same
+        seed, the cases it completed are kept, except for their outputs if the solution changed.
+        """
+        previous = self.run or {}
+        if not resume or any(previous.get(key) != value for key, value in run.items() if key != 'exe'):
+            self.inputs = set()
+        if not resume or previous != run:
+            self.outputs = set()
+        self.run = run
+        os.makedirs(os.path.dirname(self.filename) or '.', exist_ok=True)
+        # the kept entries are rewritten, so that the journal does not grow with every resumed run
+        temp = self.filename + '.tmp'
+        with open(temp, 'w') as f:
+            f.write(json.dumps(run) + '\n')
+            for stage, cases in (('input', self.inputs), ('output', self.outputs)):
+                for batch, case in sorted(cases):
+                    f.write(json.dumps([batch, case, stage]) + '\n')
+        os.replace(temp, self.filename)
+        self._file = open(self.filename, 'a')
+
+    def record(self, batch, case, stage):
+        """
+        stage: 'input' once the .in file of the case is written, or 'output' once its .out file is
+        """
+        with self._lock:
+            self._file.write(json.dumps([batch, case, stage]) + '\n')
+            # flushed right away, as the run may be killed at any point
+            self._file.flush()
+            (self.inputs if stage == 'input' else self.outputs).add((batch, case))
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
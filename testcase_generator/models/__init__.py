@@ -2,5 +2,5 @@ from testcase_generator.models.constraints import (
     BaseConstraint, BoundedConstraint, ChoiceConstraint, CustomGeneratorConstraint, NoArgumentConstraint,
 )
 from testcase_generator.models.models import (
-    Batch, Case, Generator,
+    Batch, Case, CaseSpec, Generator, LazyCases,
 )
@@ -1,6 +1,30 @@
 import copy
 import random
 
+from testcase_generator.sampling import sample_indices
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+INT64_MIN = -2**63
+INT64_MAX = 2**63 - 1
+# random.choices picks an index with floor(random() * n) from a 53-bit float, so each index has a chance
+# between floor(2**53 / n) / 2**53 and ceil(2**53 / n) / 2**53. The bias grows with n, and beyond 2**32 choices it is
+# no longer negligible, so larger ranges use randrange, which is exact.
+MAX_CHOICES = 2**32
+
+
+def random_method(generator):
+    """
+    Returns the function behind generator if it is a method of a random.Random object, like random.randint,
+    and None otherwise.
+    """
+    if isinstance(getattr(generator, '__self__', None), random.Random):
+        return generator.__func__
+    return None
+
 
 class BaseConstraint:
     def __init__(self, *args, **kwargs):
@@ -10,15 +34,34 @@ class BaseConstraint:
     def set_args(self, *args):
         self.args = args
 
+    def set_random(self, rng):
+        """
+        Makes a generator that is a method of a random.Random object, like the default random.randint,
+        use rng instead.
+        """
+        if random_method(self.generator) is not None:
+            self.generator = getattr(rng, self.generator.__name__)
+
     @property
     def next(self):
         return self.generator(*self.args)
 
+    def next_many(self, k, numpy_random=None):
+        """
+        Returns a list of k values.
+        numpy_random: a numpy.random.Generator, which is used to return a NumPy array instead
+                      if the generator of this constraint can be vectorized
+        """
+        generator = self.generator
+        args = self.args
+        return [generator(*args) for i in range(k)]
+
     def __str__(self):
         return '[{args}]'.format(args=', '.join(*self.args))
 
     def copy(self):
-        return copy.deepcopy(self)
+        # the arguments and the generator are replaced rather than changed, so a shallow copy is independent
+        return copy.copy(self)
 
 
 class ChoiceConstraint(BaseConstraint):
@@ -34,6 +77,31 @@ class ChoiceConstraint(BaseConstraint):
     def choice_count(self):
         return len(self.choices)
 
+    def next_many(self, k, numpy_random=None):
+        if random_method(self.generator) is not random.Random.choice:
+            return super().next_many(k)
+        if numpy_random is not None:
+            choices = numpy.array(list(self.choices))
+            return choices[numpy_random.integers(0, len(choices), size=k)]
+        rng = self.generator.__self__
+        if self.choice_count <= MAX_CHOICES:
+            return rng.choices(self.choices, k=k)
+        return [self.choice(rng) for i in range(k)]
+
+    def choice(self, rng=random):
+        """
+        Returns a uniformly random choice. Unlike random.choice, this works for choices of any size.
+        """
+        return self.choices[rng.randrange(self.choice_count)]
+
+    def sample(self, count, k=1, rng=random):
+        """
+        Returns count random choices in a random order, where each choice occurs at most k times.
+        Uses O(count) memory, regardless of the number of choices.
+        """
+        choices = self.choices
+        return [choices[i // k] for i in sample_indices(rng, self.choice_count * k, count)]
+
 
 class BoundedConstraint(ChoiceConstraint):
     def __init__(self, *args, **kwargs):
@@ -44,8 +112,9 @@ class BoundedConstraint(ChoiceConstraint):
 
     @property
     def choices(self):
+        # a range is a lazy, indexable and sliceable view of the values
         if isinstance(self.min, int) and isinstance(self.max, int):
-            return list(range(self.min, self.max + 1))
+            return range(self.min, self.max + 1)
         raise ValueError('Cannot determine the possible choices.')
 
     @property
@@ -54,6 +123,26 @@ class BoundedConstraint(ChoiceConstraint):
             return self.max - self.min + 1
         raise ValueError('Cannot determine the number of choices.')
 
+    def next_many(self, k, numpy_random=None):
+        function = random_method(self.generator)
+        _min, _max = self.min, self.max
+        if function is random.Random.randint and isinstance(_min, int) and isinstance(_max, int):
+            if numpy_random is not None and INT64_MIN <= _min and _max <= INT64_MAX:
+                return numpy_random.integers(_min, _max, size=k, endpoint=True)
+            rng = self.generator.__self__
+            if self.choice_count <= MAX_CHOICES:
+                return rng.choices(self.choices, k=k)
+            randrange = rng.randrange
+            return [randrange(_min, _max + 1) for i in range(k)]
+        if function is random.Random.uniform:
+            if numpy_random is not None:
+                return numpy_random.uniform(_min, _max, size=k)
+            # the same formula as random.uniform
+            rnd = self.generator.__self__.random
+            width = _max - _min
+            return [_min + width * rnd() for i in range(k)]
+        return BaseConstraint.next_many(self, k)
+
     @property
     def min(self):
         return self.args[0]
@@ -80,8 +169,14 @@ class CustomGeneratorConstraint(NoArgumentConstraint):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.generator_object = None
+        self.random = None
+
+    def set_random(self, rng):
+        self.random = rng
 
     def initialize(self, *args, **kwargs):
+        if self.random is not None:
+            kwargs.setdefault('seed', self.random.getrandbits(64))
         self.generator_object = self.generator(*args, **kwargs)
 
     @property
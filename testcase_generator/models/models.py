@@ -1,43 +1,182 @@
+import bisect
+import contextlib
+import itertools
+import multiprocessing
 import os
-import types
+import random
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 
+from testcase_generator.archive import ArchiveWriter
+from testcase_generator.cache import BuildCache
+from testcase_generator.exceptions import CaseGenerationError
+from testcase_generator.formatter import BUFFER_SIZE, LineWriter, TEMP_SUFFIX
+from testcase_generator.journal import RunJournal
 from testcase_generator.models import BaseConstraint
+from testcase_generator.profiling import CaseStats, RunReport, profile_call
+from testcase_generator.rng import derive_seed
+from testcase_generator.runner import SolutionRunner
 
 
 class Case:
     SET_CONSTRAINTS = None
     SET_INPUT = None
 
+    # the attributes set by SET_CONSTRAINTS, which only runs once and is shared by every case
+    _template_function = None
+    _template = None
+
     def __init__(self, *args, **kwargs):
+        """
+        args: dicts of constraints that replace the global constraints of this case
+        kwargs: constraints that replace the global constraints of this case
+        The constraints are copied the first time they are accessed from the case, so the same constraint objects
+        can be given to many cases.
+        """
         if Case.SET_INPUT is None:
             raise ValueError('Case.SET_INPUT is not set to a function.')
         if Case.SET_CONSTRAINTS is None:
             raise ValueError('Case.SET_CONSTRAINTS is not set to a function.')
 
-        self.set_constraints = types.MethodType(Case.SET_CONSTRAINTS, self)
-        self.generate_input = types.MethodType(Case.SET_INPUT, self)
-
-        self.set_constraints()
+        self._template = Case.template()
+        self._set_input = Case.SET_INPUT
+        self._overrides = {}
+        self.random = None
         for dic in args:
             for name, constraint in dic.items():
                 self.set(name, constraint)
         for name, constraint in kwargs.items():
             self.set(name, constraint)
 
+    @staticmethod
+    def template():
+        """
+        Returns the attributes set by SET_CONSTRAINTS, which is only run again when it changes.
+        """
+        if Case.SET_CONSTRAINTS is None:
+            raise ValueError('Case.SET_CONSTRAINTS is not set to a function.')
+        if Case._template_function is not Case.SET_CONSTRAINTS:
+            template = object.__new__(Case)
+            template._template = {}
+            template._overrides = {}
+            Case.SET_CONSTRAINTS(template)
+            Case._template = {name: value for name, value in vars(template).items() if not name.startswith('_')}
+            Case._template_function = Case.SET_CONSTRAINTS
+        return Case._template
+
+    @staticmethod
+    def get_global(var):
+        """
+        Returns the global constraint var, which must not be changed.
+        """
+        constraint = Case.template()[var]
+        if not isinstance(constraint, BaseConstraint):
+            raise KeyError(var)
+        return constraint
+
+    def __getattr__(self, name):
+        # only called for attributes that are not set on the case yet
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if name in self._overrides:
+            value = self._overrides[name]
+        elif name in self._template:
+            value = self._template[name]
+        else:
+            raise AttributeError("'Case' object has no attribute '{}'".format(name))
+        if isinstance(value, BaseConstraint):
+            # copy on access, so that the shared constraint is never changed
+            value = value.copy()
+            if self.random is not None:
+                value.set_random(self.random)
+            self.__dict__[name] = value
+        return value
+
+    def set_constraints(self):
+        Case.SET_CONSTRAINTS(self)
+
+    def generate_input(self, **kwargs):
+        return self._set_input(self, **kwargs)
+
     def set(self, var, val):
-        setattr(self, var, val)
+        self._overrides[var] = val
+        self.__dict__.pop(var, None)
+
+    def reset(self):
+        """
+        Discards the changes made to the constraints of this case since they were first accessed.
+        """
+        for name, value in list(self.__dict__.items()):
+            if isinstance(value, BaseConstraint):
+                del self.__dict__[name]
+
+    def set_random(self, rng):
+        """
+        Makes every constraint of this case use rng, which is also available as self.random.
+        """
+        self.random = rng
+        for value in self.__dict__.values():
+            if isinstance(value, BaseConstraint):
+                value.set_random(rng)
 
     @property
     def dict(self):
-        return {x[0]: x[1] for x in self.__dict__.items() if isinstance(x[1], BaseConstraint)}
+        names = dict.fromkeys(self._template)
+        names.update(dict.fromkeys(self._overrides))
+        names.update(dict.fromkeys(self.__dict__))
+        return {name: value for name, value in ((name, getattr(self, name)) for name in names if name[0] != '_')
+                if isinstance(value, BaseConstraint)}
 
     def get(self, var):
-        return self.dict[var]
+        value = getattr(self, var, None)
+        if not isinstance(value, BaseConstraint):
+            raise KeyError(var)
+        return value
 
     def __str__(self):
         return '\n'.join('{} = {}'.format(x, y) for x, y in self.dict.items()) + '\n'
 
 
+class CaseSpec:
+    def __init__(self, constraints=None, repeat=1):
+        """
+        Describes repeat cases with the same constraints, which are only created when they are used.
+        constraints: a dict of constraints that replace the global constraints of the cases
+        """
+        self.constraints = constraints if constraints is not None else {}
+        self.repeat = repeat
+
+    def case(self):
+        return Case(self.constraints)
+
+
+class LazyCases:
+    def __init__(self, specs):
+        """
+        A sequence of the cases described by a list of CaseSpec objects. A new Case is created every time one is
+        accessed, so only the specs are kept in memory no matter how many times they are repeated.
+        """
+        self.specs = specs
+        # the index after the last case of each spec
+        self._ends = list(itertools.accumulate(spec.repeat for spec in specs))
+
+    def __len__(self):
+        return self._ends[-1] if self._ends else 0
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('case index out of range')
+        return self.specs[bisect.bisect_right(self._ends, index)].case()
+
+    def __iter__(self):
+        for spec in self.specs:
+            for i in range(spec.repeat):
+                yield spec.case()
+
+
 class Batch:
     CASES_DIR = 'cases'
     BATCH_DIR = 'batch'
@@ -45,46 +184,499 @@ class Batch:
     def __init__(self, num, cases, start=0):
         self.batch = num
         self.start_case = start
+        # a list of Case objects, or any other sequence of them such as LazyCases
         self.cases = cases
 
-        try:
-            os.mkdir(Batch.CASES_DIR)
-        except FileExistsError:
-            pass
-        try:
-            os.mkdir(self.location)
-        except FileExistsError:
-            pass
-
     @property
     def location(self):
         return os.path.join(Batch.CASES_DIR, Batch.BATCH_DIR + str(self.batch))
 
-    def generate_output(self, exe, filename):
-        if exe is not None:
-            os.system('{0} < {1}.in > {1}.out'.format(exe, filename))
+    def filename(self, case_num):
+        return os.path.join(self.location, str(case_num))
+
+    def make_dirs(self):
+        # only created once the batch is run, so that building batches has no side effects
+        os.makedirs(self.location, exist_ok=True)
+
+    def generate_output(self, runner, case_num, stream=None):
+        """
+        Returns the future of the solution run, or None without a runner.
+        """
+        if stream is not None:
+            return runner.submit_stream(stream, self.batch, case_num)
+        if runner is not None:
+            return runner.submit(self.filename(case_num), self.batch, case_num)
+        return None
+
+    def write_input(self, case_num, case, out, seed, random_class=random.Random, stats=None):
+        """
+        Writes the input of a case to out. The input only depends on the run seed and the case.
+        stats: a CaseStats the time spent on the case is added to
+        """
+        # the seed of a case only depends on the run seed, the batch number and the case number
+        seed = derive_seed(seed, self.batch, case_num)
+        # generate_input may change the constraints with set_min and such, which must not carry over to the
+        # next time this case is generated
+        case.reset()
+        case.set_random(random_class(seed))
+        # for generators that use the random module directly
+        random.seed(seed)
+        try:
+            writer = LineWriter(out)
+            lines = case.generate_input(batch=self.batch)
+            if stats is not None:
+                stats.write(lines, writer)
+                return
+            for line in lines:
+                writer.write(line)
+            writer.flush()
+        finally:
+            case.reset()
+
+    def run_case(self, case_num, case, runner, seed, stream=False, random_class=random.Random, stats=None):
+        filename = self.filename(case_num)
+        solution_stream = None
+        try:
+            if stream and runner is not None:
+                out = solution_stream = runner.stream(filename, self.batch, case_num)
+            else:
+                # renamed once it is complete, the stream does the same
+                out = open(filename + '.in' + TEMP_SUFFIX, 'w', buffering=BUFFER_SIZE)
+            with out:
+                self.write_input(case_num, case, out, seed, random_class, stats)
+            if solution_stream is None:
+                os.replace(filename + '.in' + TEMP_SUFFIX, filename + '.in')
+        except Exception as e:
+            if solution_stream is None:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(filename + '.in' + TEMP_SUFFIX)
+            raise CaseGenerationError(self.batch, case_num, '{}: {}'.format(type(e).__name__, e)) from e
+        if stats is not None:
+            stats.bytes = os.path.getsize(filename + '.in')
+        return self.generate_output(runner, case_num, solution_stream)
+
+    def archive_case(self, archive, case_num, future=None, solved=False):
+        """
+        Adds the .in file of a case to the archive, and its .out file once the solution run of future succeeds,
+        or right away if the case is already solved. The files are removed afterwards unless the archive keeps
+        them.
+        """
+        filename = self.filename(case_num)
 
-    def run(self, exe):
+        def add_output(future):
+            try:
+                if solved or _succeeded(future):
+                    archive.add(self.batch, case_num, 'out', filename + '.out')
+                if not archive.keep_files:
+                    for ext in ('.in', '.out'):
+                        with contextlib.suppress(FileNotFoundError):
+                            os.remove(filename + ext)
+            except Exception as e:
+                # errors in future callbacks are only logged, so they are raised when the archive is closed
+                if archive.error is None:
+                    archive.error = e
+
+        archive.add(self.batch, case_num, 'in', filename + '.in')
+        if future is None:
+            add_output(None)
+            if archive.error is not None:
+                raise archive.error
+        else:
+            future.add_done_callback(add_output)
+
+    def run(self, runner=None, seed=None, stream=False, random_class=random.Random, archive=None):
+        """
+        runner: a SolutionRunner, or the command used to generate the output files. When it is a command,
+                the solution results are returned once every case is done.
+        archive: an ArchiveWriter the files of every case are added to, which must only be closed once the
+                 runner is
+        """
+        if isinstance(runner, (str, list, tuple)):
+            runner = SolutionRunner(runner)
+            try:
+                self.run(runner, seed, stream, random_class, archive)
+                return runner.wait()
+            finally:
+                runner.close()
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.make_dirs()
         for case_num, case in enumerate(self.cases, self.start_case):
-            filename = os.path.join(self.location, str(case_num))
-            with open(filename + '.in', 'w') as out:
-                for line in case.generate_input(batch=self.batch):
-                    try:
-                        iter(line)
-                    except TypeError:
-                        line = str(line)
-                    else:
-                        if not isinstance(line, str):
-                            line = ' '.join(map(str, line))
-                    out.write(line + '\n')
-            self.generate_output(exe, filename)
+            future = self.run_case(case_num, case, runner, seed, stream, random_class)
+            if archive is not None:
+                self.archive_case(archive, case_num, future)
+
+
+def _succeeded(future):
+    return future is not None and not future.cancelled() and future.exception() is None and future.result().ok
+
+
+# state shared with forked worker processes, see Generator._start_parallel
+_pool_batches = None
+_pool_runner = None
+
+
+def _run_pool_case(batch_index, case_index, seed, random_class, profile):
+    """
+    Returns the solution results of the case, and its CaseStats if profile is set.
+    """
+    batch = _pool_batches[batch_index]
+    case_num = batch.start_case + case_index
+    stats = CaseStats(batch.batch, case_num) if profile else None
+    if _pool_runner is None:
+        batch.run_case(case_num, batch.cases[case_index], None, seed, random_class=random_class, stats=stats)
+        return [], stats
+    # the threads of the parent's runner do not survive the fork
+    runner = _pool_runner.copy(workers=1)
+    try:
+        batch.run_case(case_num, batch.cases[case_index], runner, seed, stream=True, random_class=random_class,
+                       stats=stats)
+        return runner.wait(), stats
+    finally:
+        runner.close()
 
 
 class Generator:
-    def __init__(self, batches, exe=None):
+    def __init__(self, batches, exe=None, jobs=1, seed=None, timeout=None, cpu_limit=None, solution_jobs=None,
+                 stream=False, random_class=random.Random, cache=False, resume=False, archive=None,
+                 archive_level=None, archive_names=None, keep_cases=True, profile=False, profile_slowest=0,
+                 report_file=None):
+        """
+        batches: a list of Batch objects
+        exe: the command used to generate the output files, leave blank to skip generating output
+        jobs: the number of processes used to generate cases
+        seed: the run seed, every case is seeded from it so that runs with the same seed are identical
+        random_class: the random.Random subclass given to each case and its constraints, such as NumpyRandom
+        timeout: the wall-clock limit in seconds of the solution on a single case
+        cpu_limit: the CPU time limit in seconds of the solution on a single case
+        solution_jobs: the maximum number of solutions running at once, defaults to the number of CPUs
+        stream: pipe the input into the solution while it is being generated instead of running the solution
+                on the finished .in file
+        cache: skip the cases whose files are up to date, according to a manifest in CASES_DIR. A .in file is
+               regenerated when the constraints or the seed of its case, or the source of SET_CONSTRAINTS or
+               SET_INPUT changes, and a .out file when its input or the solution changes. Requires the seed.
+        resume: continue the run recorded in the journal next to CASES_DIR, which every run writes, by skipping
+                the cases it completed. Uses the seed of that run if the seed is not set.
+        archive: a zip or tar archive the files of every case are added to as soon as they are complete, see
+                 ArchiveWriter for the supported types
+        archive_level: the compression level of the archive, from 0 to 9
+        archive_names: the format of the names of the files in the archive, such as '{batch}.{case}.{ext}', see
+                       ArchiveWriter.NAME_FORMAT for the default
+        keep_cases: whether the files are kept in CASES_DIR. When False, they are only written to a temporary
+                    directory until they are added to the archive.
+        profile: time the generation, writing and solution of every case, and print a summary to stderr at the
+                 end of the run. The RunReport is available in Generator.report.
+        profile_slowest: profile the generation of this many of the slowest cases with cProfile, by generating
+                         them again after the run. Enables profile.
+        report_file: save the RunReport to this file as JSON. Enables profile.
+        """
         self.batches = batches
         self.exe = exe
+        self.jobs = jobs
+        self.seed = seed
+        self.timeout = timeout
+        self.cpu_limit = cpu_limit
+        self.solution_jobs = solution_jobs
+        self.stream = stream
+        self.random_class = random_class
+        self.cache = cache
+        self.resume = resume
+        self.archive = archive
+        self.archive_level = archive_level
+        self.archive_names = archive_names
+        self.keep_cases = keep_cases
+        self.profile = profile or bool(profile_slowest) or report_file is not None
+        self.profile_slowest = profile_slowest
+        self.report_file = report_file
+        self.results = []
+        self.report = None
+        # the CaseStats of the current run, by batch and case number
+        self._case_stats = None
+
+    def _select(self, cases):
+        """
+        Returns the (batch index, case index) pairs of the selected cases, in order.
+        """
+        if cases is None:
+            return [(batch_index, case_index) for batch_index, batch in enumerate(self.batches)
+                    for case_index in range(len(batch.cases))]
+
+        batch_indices = {batch.batch: batch_index for batch_index, batch in enumerate(self.batches)}
+        selected = set()
+        for num, case_nums in cases.items():
+            if num not in batch_indices:
+                raise ValueError('Unknown batch {}.'.format(num))
+            batch_index = batch_indices[num]
+            batch = self.batches[batch_index]
+            if case_nums is None:
+                case_nums = range(batch.start_case, batch.start_case + len(batch.cases))
+            for case_num in case_nums:
+                case_index = case_num - batch.start_case
+                if not 0 <= case_index < len(batch.cases):
+                    raise ValueError('Unknown case {} in batch {}.'.format(case_num, num))
+                selected.add((batch_index, case_index))
+        return sorted(selected)
+
+    def _apply_cache(self, cache, selected, seed):
+        """
+        Returns the selected cases whose input has to be generated, and the ones that only need their output,
+        and forgets the keys of both in the cache until they are done.
+        """
+        generate = []
+        solve = []
+        keys = {}
+        for batch_index, case_index in selected:
+            batch = self.batches[batch_index]
+            case_num = batch.start_case + case_index
+            filename = batch.filename(case_num)
+            name = os.path.relpath(filename, Batch.CASES_DIR)
+            input_key = cache.input_key(batch.cases[case_index], batch.batch, case_num, seed, self.random_class)
+            output_key = cache.output_key(input_key)
+            keys[batch.batch, case_num] = (name, input_key, output_key)
+            entry = cache.get(name)
+            if entry.get('input') != input_key or not os.path.exists(filename + '.in'):
+                generate.append((batch_index, case_index))
+                cache.set(name)
+            elif output_key is not None and (entry.get('output') != output_key or
+                                             not os.path.exists(filename + '.out')):
+                solve.append((batch_index, case_index))
+                cache.set(name, input_key)
+        cache.save()
+        return generate, solve, keys
+
+    def _validate(self):
+        if self.jobs > 1 and 'fork' not in multiprocessing.get_all_start_methods():
+            raise ValueError('Parallel generation requires the fork start method, which this platform lacks.')
+        if not self.keep_cases:
+            if self.archive is None:
+                raise ValueError('An archive must be set to skip keeping the cases.')
+            if self.cache or self.resume:
+                raise ValueError('The cache and resuming require the cases to be kept.')
+
+    def _archive_names(self, archive, selected):
+        names = set()
+        for batch_index, case_index in selected:
+            batch = self.batches[batch_index]
+            for ext in ('in', 'out'):
+                name = archive.name(batch.batch, batch.start_case + case_index, ext)
+                if name in names:
+                    raise ValueError('The file name {} is used twice in the archive.'.format(name))
+                names.add(name)
+
+    def _apply_journal(self, journal, generate, solve):
+        """
+        Drops the cases that were completed by the journaled run from the ones to generate and solve.
+        """
+        def done(batch_index, case_index, stage, ext):
+            batch = self.batches[batch_index]
+            case_num = batch.start_case + case_index
+            cases = journal.inputs if stage == 'input' else journal.outputs
+            return (batch.batch, case_num) in cases and os.path.exists(batch.filename(case_num) + ext)
 
-    def start(self):
-        for x in self.batches:
-            x.run(self.exe)
+        remaining = []
+        for batch_index, case_index in generate:
+            if not done(batch_index, case_index, 'input', '.in'):
+                remaining.append((batch_index, case_index))
+            elif self.exe is not None:
+                solve.append((batch_index, case_index))
+        solve = [(batch_index, case_index) for batch_index, case_index in sorted(solve)
+                 if not done(batch_index, case_index, 'output', '.out')]
+        return remaining, solve
+
+    def start(self, cases=None):
+        """
+        cases: only generate these cases, as a dict from batch numbers to lists of case numbers,
+               or to None for every case of the batch. Requires the seed to be set, so that the files are
+               the same as the ones written by a full run.
+        """
+        self._validate()
+        if self.keep_cases:
+            return self._start(cases)
+        old_cases_dir = Batch.CASES_DIR
+        with tempfile.TemporaryDirectory() as temp_dir:
+            Batch.CASES_DIR = os.path.join(temp_dir, 'cases')
+            try:
+                return self._start(cases)
+            finally:
+                Batch.CASES_DIR = old_cases_dir
+
+    def _start(self, cases):
+        journal = RunJournal(os.path.normpath(Batch.CASES_DIR) + RunJournal.SUFFIX)
+        seed = self.seed
+        if self.resume:
+            run = journal.load()
+            if seed is None and run is not None:
+                seed = run['seed']
+        if seed is None:
+            if cases is not None:
+                raise ValueError('A seed must be set to regenerate cases.')
+            seed = random.getrandbits(64)
+        exe_args = None if self.exe is None else SolutionRunner.split(self.exe)
+        selected = requested = self._select(cases)
+        solve = []
+        cache = keys = None
+        if self.cache:
+            if self.seed is None:
+                raise ValueError('A seed must be set to use the cache.')
+            cache = BuildCache(os.path.join(Batch.CASES_DIR, BuildCache.FILENAME), exe_args)
+            selected, solve, keys = self._apply_cache(cache, selected, seed)
+        journal.start({
+            'seed': seed,
+            'random_class': self.random_class.__module__ + '.' + self.random_class.__qualname__,
+            'exe': exe_args,
+        }, self.resume)
+        archive = None
+        try:
+            selected, solve = self._apply_journal(journal, selected, solve)
+            for batch_index in sorted({batch_index for batch_index, case_index in selected}):
+                self.batches[batch_index].make_dirs()
+            if self.archive is not None:
+                archive = ArchiveWriter(self.archive, self.archive_level, self.archive_names, self.keep_cases)
+            with archive or contextlib.nullcontext():
+                if archive is not None:
+                    self._archive_names(archive, requested)
+                    # the cases skipped by the cache or the journal are added from their files
+                    for batch_index, case_index in sorted(set(requested) - set(selected) - set(solve)):
+                        batch = self.batches[batch_index]
+                        batch.archive_case(archive, batch.start_case + case_index, solved=self.exe is not None)
+                self._case_stats = {} if self.profile else None
+                self._run(selected, solve, seed, journal, archive)
+        finally:
+            journal.close()
+        if cache is not None:
+            self._update_cache(cache, journal, keys)
+        if self.profile:
+            self._report(seed)
+
+    def _report(self, seed):
+        case_stats, self._case_stats = self._case_stats, None
+        for result in self.results:
+            key = result.batch, result.case
+            if key not in case_stats:
+                # a case that was only solved
+                case_stats[key] = CaseStats(result.batch, result.case)
+            case_stats[key].solution = result
+
+        generated = [stats for stats in case_stats.values() if stats.lines or stats.time]
+        generated.sort(key=lambda stats: stats.time, reverse=True)
+        batches = {batch.batch: batch for batch in self.batches}
+        for stats in generated[:self.profile_slowest]:
+            batch = batches[stats.batch]
+            # the input only depends on the seed, so it is the same when generated again
+            with open(os.devnull, 'w', buffering=BUFFER_SIZE) as out:
+                stats.profile = profile_call(batch.write_input, stats.case, batch.cases[stats.case - batch.start_case],
+                                             out, seed, self.random_class)
+
+        self.report = RunReport(case_stats.values())
+        if self.report_file is not None:
+            self.report.save(self.report_file)
+        print(self.report.summary(max(self.profile_slowest, 5)), file=sys.stderr)
+
+    def _run(self, selected, solve, seed, journal, archive):
+        self.results = []
+        runner = None
+        if self.exe is not None:
+            semaphore = None
+            if self.jobs > 1 and self.stream:
+                # streamed cases are solved in the worker processes, which share this limit
+                workers = self.solution_jobs or os.cpu_count() or 1
+                semaphore = multiprocessing.get_context('fork').BoundedSemaphore(workers)
+            runner = SolutionRunner(self.exe, workers=self.solution_jobs, timeout=self.timeout,
+                                    cpu_limit=self.cpu_limit, semaphore=semaphore)
+        try:
+            results = []
+            if self.jobs > 1:
+                results = self._start_parallel(selected, runner, seed, journal, archive)
+            else:
+                for batch_index, case_index in selected:
+                    batch = self.batches[batch_index]
+                    case_num = batch.start_case + case_index
+                    stats = None
+                    if self._case_stats is not None:
+                        stats = self._case_stats[batch.batch, case_num] = CaseStats(batch.batch, case_num)
+                    future = batch.run_case(case_num, batch.cases[case_index], runner, seed, self.stream,
+                                            self.random_class, stats)
+                    self._record(journal, archive, batch, case_num, future)
+            for batch_index, case_index in solve:
+                batch = self.batches[batch_index]
+                case_num = batch.start_case + case_index
+                future = batch.generate_output(runner, case_num)
+                self._record(journal, archive, batch, case_num, future, input=False)
+            if runner is not None:
+                self.results = results + runner.wait()
+        finally:
+            if runner is not None:
+                runner.close()
+
+    @staticmethod
+    def _record(journal, archive, batch, case_num, future, input=True):
+        """
+        Records the input of a case in the journal, and its output once the solution succeeds, and adds the
+        files to the archive.
+        """
+        def record_output(future):
+            if _succeeded(future):
+                journal.record(batch.batch, case_num, 'output')
+
+        if input:
+            journal.record(batch.batch, case_num, 'input')
+        if future is not None:
+            future.add_done_callback(record_output)
+        if archive is not None:
+            batch.archive_case(archive, case_num, future)
+
+    def _update_cache(self, cache, journal, keys):
+        # only the cases completed by this run are recorded, and the output only if the solution succeeded
+        for case, (name, input_key, output_key) in keys.items():
+            if case in journal.outputs:
+                cache.set(name, input_key, output_key)
+            elif case in journal.inputs:
+                cache.set(name, input_key)
+        cache.save()
+
+    def regenerate(self, batch, cases=None):
+        """
+        Regenerates the given case numbers of a batch, or the whole batch if cases is None.
+        """
+        self.start({batch: cases})
+
+    def _start_parallel(self, selected, runner, seed, journal, archive):
+        global _pool_batches, _pool_runner
+        # the cases hold references to SET_CONSTRAINTS and SET_INPUT, which are usually not picklable,
+        # so the workers are forked and look up their cases by index instead
+        _pool_batches = self.batches
+        # streamed cases are solved inside the worker that generates them
+        _pool_runner = runner if self.stream else None
+        results = []
+        try:
+            with ProcessPoolExecutor(max_workers=self.jobs, mp_context=multiprocessing.get_context('fork')) as pool:
+                futures = []
+                for batch_index, case_index in selected:
+                    batch = self.batches[batch_index]
+                    future = pool.submit(_run_pool_case, batch_index, case_index, seed, self.random_class,
+                                         self._case_stats is not None)
+                    futures.append((batch, batch.start_case + case_index, future))
+                try:
+                    # the solution is run on each case as soon as its input is written
+                    for batch, case_num, future in futures:
+                        case_results, stats = future.result()
+                        results += case_results
+                        if stats is not None:
+                            self._case_stats[batch.batch, case_num] = stats
+                        if _pool_runner is None:
+                            self._record(journal, archive, batch, case_num, batch.generate_output(runner, case_num))
+                            continue
+                        solved = any(result.ok for result in case_results)
+                        journal.record(batch.batch, case_num, 'input')
+                        if solved:
+                            journal.record(batch.batch, case_num, 'output')
+                        if archive is not None:
+                            batch.archive_case(archive, case_num, solved=solved)
+                except BaseException:
+                    for batch, case_num, future in futures:
+                        future.cancel()
+                    raise
+        finally:
+            _pool_batches = None
+            _pool_runner = None
+        return results
@@ -1,6 +1,7 @@
 import yaml
 
-from testcase_generator.models import Batch, BoundedConstraint, Case
+from testcase_generator.expressions import evaluate
+from testcase_generator.models import Batch, BoundedConstraint, Case, CaseSpec, LazyCases
 
 
 class ConstraintParser:
@@ -15,22 +16,20 @@ class ConstraintParser:
 
         for var, constraint in constraints.items():
             if var not in constraints_dict:
-                constraints_dict[var] = Case().get(var).copy()
+                constraints_dict[var] = Case.get_global(var).copy()
 
             if not isinstance(constraints_dict[var], BoundedConstraint):
                 raise ValueError('The parser does not support modifiying constraint {} as '
                                  'it is not a BoundedConstraint'.format(var))
 
             _min, _max = constraints_dict[var].args
-            eval_locals = {
-                'MIN': _min,
-                'MAX': _max,
-            }
+            # MIN and MAX always refer to the bounds from before this case
+            bounds = (_min, _max)
 
             constraint = str(constraint).split('~')
             if len(constraint) == 1:
                 constraint = constraint[0]
-                new_value = eval(constraint, eval_locals)
+                new_value = evaluate(constraint, *bounds)
                 if not (_min <= new_value <= _max):
                     raise ValueError('{} for constraint {} is not in the '
                                      'global or batch constraints'.format(new_value, var))
@@ -39,13 +38,13 @@ class ConstraintParser:
             elif len(constraint) == 2:
                 lower, upper = constraint
                 if lower.strip():
-                    lower = eval(lower.strip(), eval_locals)
+                    lower = evaluate(lower, *bounds)
                     if lower < _min:
                         raise ValueError('{} for constraint {} is not in the '
                                          'global or batch constraints'.format(lower, var))
                     _min = lower
                 if upper.strip():
-                    upper = eval(upper.strip(), eval_locals)
+                    upper = evaluate(upper, *bounds)
                     if upper > _max:
                         raise ValueError('{} for constraint {} is not in the '
                                          'global or batch constraints'.format(upper, var))
@@ -62,16 +61,17 @@ class ConstraintParser:
     def parse(self):
         for batch in self.data:
             batch_constraints = self.parse_case(batch.get('constraints', {}))
-            cases = []
+            specs = []
             for case in batch['cases']:
                 constraints = self.parse_case(case.get('constraints', {}), batch_constraints)
-                for i in range(case.get('repeat', 1)):
-                    cases.append(Case(constraints))
+                # the cases are only created when the batch is run, and share the constraints as every case
+                # copies them when they are accessed
+                specs.append(CaseSpec(constraints, case.get('repeat', 1)))
 
             self.batches.append(
                 Batch(
                     num=batch['batch'],
-                    cases=cases,
+                    cases=LazyCases(specs),
                     start=batch.get('start', 0),
                 ),
             )
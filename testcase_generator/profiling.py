@@ -0,0 +1,178 @@
+import cProfile
+import json
+import pstats
+import time
+
+# the number of functions kept from the profile of a case, by cumulative time
+PROFILE_ENTRIES = 20
+
+
+class CaseStats:
+    def __init__(self, batch, case):
+        """
+        The time spent on a case, in seconds. The generation time is spent in generate_input, including the
+        constraints and generators it uses, and the write time in formatting and writing the lines. When the
+        input is streamed, writing also waits for the solution to read it.
+        """
+        self.batch = batch
+        self.case = case
+        self.generate_time = 0.0
+        self.write_time = 0.0
+        self.bytes = 0
+        self.lines = 0
+        # the RunResult of the solution
+        self.solution = None
+        # the functions with the highest cumulative time, see profile_call
+        self.profile = None
+
+    @property
+    def time(self):
+        return self.generate_time + self.write_time
+
+    def write(self, lines, writer):
+        """
+        Writes the lines yielded from generate_input, timing generation and writing separately.
+        """
+        # the two are interleaved, so they are timed line by line
+        clock = time.perf_counter
+        generate_time = write_time = 0.0
+        lines = iter(lines)
+        while True:
+            start = clock()
+            try:
+                line = next(lines)
+            except StopIteration:
+                generate_time += clock() - start
+                break
+            written = clock()
+            writer.write(line)
+            generate_time += written - start
+            write_time += clock() - written
+        start = clock()
+        writer.flush()
+        self.generate_time += generate_time
+        self.write_time += write_time + clock() - start
+        self.lines += writer.lines
+
+    def dict(self):
+        solution = self.solution
+        return {
+            'batch': self.batch,
+            'case': self.case,
+            'generate_time': self.generate_time,
+            'write_time': self.write_time,
+            'bytes': self.bytes,
+            'lines': self.lines,
+            'solution': None if solution is None else {
+                'returncode': solution.returncode,
+                'timed_out': solution.timed_out,
+                'wall_time': solution.wall_time,
+                'cpu_time': solution.cpu_time,
+                'max_rss': solution.max_rss,
+            },
+            'profile': self.profile,
+        }
+
+
+def profile_call(function, *args, **kwargs):
+    """
+    Calls function under cProfile, and returns the PROFILE_ENTRIES functions with the highest cumulative time.
+    """
+    profiler = cProfile.Profile()
+    profiler.runcall(function, *args, **kwargs)
+    entries = []
+    for (filename, line, name), (primitive_calls, calls, total_time, cumulative_time, callers) in \
+            pstats.Stats(profiler).stats.items():
+        entries.append({
+            'function': '{}:{}({})'.format(filename, line, name),
+            'calls': calls,
+            'total_time': total_time,
+            'cumulative_time': cumulative_time,
+        })
+    entries.sort(key=lambda entry: entry['cumulative_time'], reverse=True)
+    return entries[:PROFILE_ENTRIES]
+
+
+class RunReport:
+    def __init__(self, cases):
+        """
+        The CaseStats of every case of a run, grouped by batch.
+        """
+        self.cases = sorted(cases, key=lambda stats: (stats.batch, stats.case))
+
+    def batches(self):
+        batches = {}
+        for stats in self.cases:
+            batch = batches.setdefault(stats.batch, {
+                'batch': stats.batch,
+                'cases': 0,
+                'generate_time': 0.0,
+                'write_time': 0.0,
+                'bytes': 0,
+                'lines': 0,
+                'solution_wall_time': 0.0,
+                'solution_cpu_time': 0.0,
+                'solution_max_rss': 0,
+            })
+            batch['cases'] += 1
+            batch['generate_time'] += stats.generate_time
+            batch['write_time'] += stats.write_time
+            batch['bytes'] += stats.bytes
+            batch['lines'] += stats.lines
+            if stats.solution is not None:
+                batch['solution_wall_time'] += stats.solution.wall_time
+                batch['solution_cpu_time'] += stats.solution.cpu_time
+                batch['solution_max_rss'] = max(batch['solution_max_rss'], stats.solution.max_rss)
+        return list(batches.values())
+
+    def dict(self):
+        return {
+            'batches': self.batches(),
+            'cases': [stats.dict() for stats in self.cases],
+        }
+
+    def save(self, filename):
+        with open(filename, 'w') as f:
+            json.dump(self.dict(), f, indent=1)
+
+    def summary(self, slowest=5):
+        """
+        Returns a table of the batches, followed by the slowest cases. Times are in seconds and the peak
+        memory of the solution in megabytes.
+        """
+        header = ('batch', 'cases', 'generate', 'write', 'MB', 'lines', 'sol wall', 'sol cpu', 'sol MB')
+        rows = []
+        for batch in self.batches():
+            rows.append((
+                batch['batch'], batch['cases'], '{:.3f}'.format(batch['generate_time']),
+                '{:.3f}'.format(batch['write_time']), '{:.2f}'.format(batch['bytes'] / 10**6), batch['lines'],
+                '{:.3f}'.format(batch['solution_wall_time']), '{:.3f}'.format(batch['solution_cpu_time']),
+                '{:.1f}'.format(batch['solution_max_rss'] / 1024),
+            ))
+        lines = _table(header, rows)
+
+        cases = sorted(self.cases, key=lambda stats: stats.time, reverse=True)[:slowest]
+        if cases:
+            lines.append('')
+            lines.append('Slowest cases:')
+            rows = []
+            for stats in cases:
+                rows.append((
+                    stats.batch, stats.case, '{:.3f}'.format(stats.generate_time),
+                    '{:.3f}'.format(stats.write_time), '{:.2f}'.format(stats.bytes / 10**6), stats.lines,
+                    _hottest(stats.profile),
+                ))
+            lines += _table(('batch', 'case', 'generate', 'write', 'MB', 'lines', 'hottest function'), rows)
+        return '\n'.join(lines)
+
+
+def _table(header, rows):
+    rows = [tuple(map(str, row)) for row in [header] + rows]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+    return ['  '.join(value.rjust(width) for value, width in zip(row, widths)).rstrip() for row in rows]
+
+
+def _hottest(profile):
+    if not profile:
+        return ''
+    return max(profile, key=lambda entry: entry['total_time'])['function']
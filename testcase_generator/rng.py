@@ -0,0 +1,48 @@
+import hashlib
+import random
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def derive_seed(seed, *keys):
+    """
+    Derives a child seed from a parent seed, one level per key. For example, derive_seed(seed, batch, case)
+    is the seed of a case, and it does not depend on any other case.
+    """
+    for key in keys:
+        seed = int.from_bytes(hashlib.sha256('{}:{}'.format(seed, key).encode()).digest()[:8], 'big')
+    return seed
+
+
+class NumpyRandom(random.Random):
+    """
+    A random.Random backed by the PCG64 generator of NumPy, which can be passed to a Generator as its
+    random_class. The NumPy generator itself is available as the numpy attribute for vectorized draws.
+    """
+
+    def __init__(self, x=None):
+        if numpy is None:
+            raise ValueError('NumPy is not installed.')
+        super().__init__(x)
+
+    def seed(self, a=None, version=2):
+        self.numpy = numpy.random.Generator(numpy.random.PCG64(a))
+        self.gauss_next = None
+
+    def random(self):
+        return self.numpy.random()
+
+    def getrandbits(self, k):
+        if k < 0:
+            raise ValueError('number of bits must be non-negative')
+        num_bytes = (k + 7) // 8
+        return int.from_bytes(self.numpy.bytes(num_bytes), 'little') >> (num_bytes * 8 - k)
+
+    def getstate(self):
+        return self.numpy.bit_generator.state, self.gauss_next
+
+    def setstate(self, state):
+        self.numpy.bit_generator.state, self.gauss_next = state
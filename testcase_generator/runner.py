@@ -0,0 +1,277 @@
+import logging
+import math
+import os
+import shlex
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from testcase_generator.exceptions import CaseGenerationError
+from testcase_generator.formatter import BUFFER_SIZE, TEMP_SUFFIX
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+def _remove(filename):
+    try:
+        os.remove(filename)
+    except FileNotFoundError:
+        pass
+
+
+class RunResult:
+    def __init__(self, batch, case, returncode, timed_out=False, wall_time=0.0, cpu_time=0.0, max_rss=0):
+        self.batch = batch
+        self.case = case
+        self.returncode = returncode
+        self.timed_out = timed_out
+        self.wall_time = wall_time
+        self.cpu_time = cpu_time
+        # in kilobytes
+        self.max_rss = max_rss
+
+    @property
+    def ok(self):
+        return self.returncode == 0 and not self.timed_out
+
+    def __str__(self):
+        if self.timed_out:
+            status = 'timed out'
+        elif self.returncode < 0:
+            status = 'killed by signal {}'.format(-self.returncode)
+        else:
+            status = 'exited with code {}'.format(self.returncode)
+        return 'Batch {}, case {}: {} after {:.2f}s'.format(self.batch, self.case, status, self.wall_time)
+
+
+class _Run:
+    def __init__(self, process, timeout, batch, case, slot=None, output=None):
+        self.process = process
+        # the .out file, which is written under TEMP_SUFFIX until the solution succeeds
+        self.output = output
+        # released once the process is reaped, see SolutionRunner._launch
+        self.slot = slot
+        self.batch = batch
+        self.case = case
+        self.start = time.monotonic()
+        self.timed_out = threading.Event()
+        # set once the process has exited, after which its pid must no longer be signalled
+        self.finished = False
+        self.lock = threading.Lock()
+        self.timer = None
+        if timeout is not None:
+            self.timer = threading.Timer(timeout, self.kill)
+            self.timer.start()
+
+    def _exited(self, options=0):
+        # WNOWAIT leaves the process as a zombie, so its pid cannot be reused yet
+        return os.waitid(os.P_PID, self.process.pid, os.WEXITED | os.WNOWAIT | options) is not None
+
+    def kill(self):
+        with self.lock:
+            if self.finished or self._exited(os.WNOHANG):
+                return
+            self.timed_out.set()
+            try:
+                self.process.kill()
+            except ProcessLookupError:
+                pass
+
+    def wait(self):
+        try:
+            self._exited()
+            with self.lock:
+                self.finished = True
+            # wait4 is used instead of Popen.wait as it also reports the resource usage of the process
+            _, status, usage = os.wait4(self.process.pid, 0)
+        finally:
+            if self.timer is not None:
+                self.timer.cancel()
+            slot, self.slot = self.slot, None
+            if slot is not None:
+                slot.release()
+        wall_time = time.monotonic() - self.start
+        if os.WIFSIGNALED(status):
+            self.process.returncode = -os.WTERMSIG(status)
+        else:
+            self.process.returncode = os.WEXITSTATUS(status)
+        result = RunResult(
+            batch=self.batch,
+            case=self.case,
+            returncode=self.process.returncode,
+            timed_out=self.timed_out.is_set(),
+            wall_time=wall_time,
+            cpu_time=usage.ru_utime + usage.ru_stime,
+            max_rss=usage.ru_maxrss,
+        )
+        if self.output is not None:
+            self._finish_output(result.ok)
+        return result
+
+    def _finish_output(self, ok):
+        if ok:
+            os.replace(self.output + TEMP_SUFFIX, self.output)
+            return
+        # the output of a failed solution is incomplete, and an older one no longer belongs to the input
+        _remove(self.output + TEMP_SUFFIX)
+        _remove(self.output)
+
+
+class SolutionStream:
+    """
+    Writes the input of a case to both its .in file and the standard input of the solution, which writes the
+    .out file while the input is still being generated. Writes block while the pipe is full, so the amount of
+    buffered input stays bounded.
+    """
+
+    def __init__(self, runner, filename, batch=None, case=None):
+        self._filename = filename + '.in'
+        self._file = open(self._filename + TEMP_SUFFIX, 'w', buffering=BUFFER_SIZE)
+        try:
+            with open(filename + '.out' + TEMP_SUFFIX, 'wb') as stdout:
+                self._run = runner._launch(subprocess.PIPE, stdout, batch, case, filename + '.out')
+        except BaseException:
+            self._file.close()
+            _remove(self._filename + TEMP_SUFFIX)
+            _remove(filename + '.out' + TEMP_SUFFIX)
+            raise
+        self._stdin = self._run.process.stdin
+
+    def write(self, data):
+        self._file.write(data)
+        if self._stdin is not None:
+            try:
+                self._stdin.write(data)
+            except BrokenPipeError:
+                # the solution stopped reading its input, but the .in file still has to be completed
+                self._close_stdin()
+
+    def _close_stdin(self):
+        stdin, self._stdin = self._stdin, None
+        try:
+            stdin.close()
+        except BrokenPipeError:
+            pass
+
+    def close(self, complete=True):
+        self._file.close()
+        if complete:
+            os.replace(self._filename + TEMP_SUFFIX, self._filename)
+        else:
+            os.remove(self._filename + TEMP_SUFFIX)
+        if self._stdin is not None:
+            self._close_stdin()
+
+    def wait(self):
+        return self._run.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close(complete=exc_type is None)
+        if exc_type is not None:
+            self._run.kill()
+            self._run.wait()
+            # the solution may have finished on the partial input
+            self._run._finish_output(False)
+        return False
+
+
+class SolutionRunner:
+    def __init__(self, exe, workers=None, timeout=None, cpu_limit=None, semaphore=None):
+        """
+        exe: the command used to generate the output files, either a string or a list of arguments
+        workers: the maximum number of solutions running at once, defaults to the number of CPUs
+        timeout: the wall-clock limit of a single case in seconds, which includes the time spent generating the
+                 input when it is streamed
+        cpu_limit: the CPU time limit of a single case in seconds
+        semaphore: limits the number of running solutions instead of workers, for sharing a limit between
+                   runners, such as a multiprocessing semaphore shared with forked processes
+        """
+        if cpu_limit is not None and not hasattr(resource, 'prlimit'):
+            raise ValueError('CPU limits are not supported on this platform.')
+        self.args = self.split(exe)
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.cpu_limit = cpu_limit
+        # streamed solutions are started outside of the pool, so the pool size alone does not limit them
+        self._semaphore = semaphore or threading.BoundedSemaphore(self.workers)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        self._pending = []
+
+    @staticmethod
+    def split(exe):
+        return shlex.split(exe) if isinstance(exe, str) else list(exe)
+
+    def copy(self, workers=None):
+        """
+        The copy shares the limit on the number of running solutions with this runner.
+        """
+        return SolutionRunner(self.args, workers=workers or self.workers, timeout=self.timeout,
+                              cpu_limit=self.cpu_limit, semaphore=self._semaphore)
+
+    def _launch(self, stdin, stdout, batch, case, output=None):
+        self._semaphore.acquire()
+        try:
+            process = subprocess.Popen(self.args, stdin=stdin, stdout=stdout, universal_newlines=True,
+                                       bufsize=BUFFER_SIZE)
+        except BaseException:
+            self._semaphore.release()
+            raise
+        if self.cpu_limit is not None:
+            # set from the parent, as preexec_fn is not safe to use from threads
+            limit = math.ceil(self.cpu_limit)
+            try:
+                resource.prlimit(process.pid, resource.RLIMIT_CPU, (limit, limit + 1))
+            except ProcessLookupError:
+                pass
+        return _Run(process, self.timeout, batch, case, self._semaphore, output)
+
+    def run(self, filename, batch=None, case=None):
+        """
+        Runs the solution on the .in file. The .out file is only written once the solution succeeds.
+        """
+        output = filename + '.out'
+        try:
+            with open(filename + '.in', 'rb') as stdin, open(output + TEMP_SUFFIX, 'wb') as stdout:
+                run = self._launch(stdin, stdout, batch, case, output)
+        except BaseException:
+            _remove(output + TEMP_SUFFIX)
+            raise
+        return run.wait()
+
+    def submit(self, filename, batch=None, case=None):
+        future = self._pool.submit(self.run, filename, batch, case)
+        self._pending.append((batch, case, future))
+        return future
+
+    def stream(self, filename, batch=None, case=None):
+        return SolutionStream(self, filename, batch, case)
+
+    def submit_stream(self, stream, batch=None, case=None):
+        future = self._pool.submit(stream.wait)
+        self._pending.append((batch, case, future))
+        return future
+
+    def wait(self):
+        pending, self._pending = self._pending, []
+        results = []
+        for batch, case, future in pending:
+            try:
+                result = future.result()
+            except Exception as e:
+                raise CaseGenerationError(batch, case, '{}: {}'.format(type(e).__name__, e)) from e
+            if not result.ok:
+                logger.warning('Solution failed: %s', result)
+            results.append(result)
+        return results
+
+    def close(self):
+        self._pool.shutdown()
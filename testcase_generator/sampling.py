@@ -0,0 +1,103 @@
+import itertools
+
+try:
+    from math import isqrt
+except ImportError:  # Python < 3.8
+    def isqrt(n):
+        if n < 0:
+            raise ValueError('isqrt() argument must be nonnegative')
+        if n == 0:
+            return 0
+        x = 1 << ((n.bit_length() + 1) // 2)
+        while True:
+            y = (x + n // x) // 2
+            if y >= x:
+                return x
+            x = y
+
+
+def shuffled_indices(rng, population):
+    """
+    Lazily yields the integers of range(population) in a uniformly random order (a lazy Fisher-Yates shuffle).
+    Only the swapped positions are stored, so taking k integers uses O(k) memory.
+    rng: a random.Random object
+    """
+    randrange = rng.randrange
+    swapped = {}
+    for i in range(population):
+        j = randrange(i, population)
+        current = swapped.pop(i, i)
+        if j == i:
+            yield current
+        else:
+            yield swapped.get(j, j)
+            swapped[j] = current
+
+
+def sample_indices(rng, population, count):
+    """
+    Returns count distinct integers from range(population) in a uniformly random order.
+    Uses O(count) memory and O(count) time, so the population can be far larger than what fits in memory.
+    rng: a random.Random object
+    """
+    if not 0 <= count <= population:
+        raise ValueError('Cannot sample {} distinct values out of {}.'.format(count, population))
+
+    if count * 2 >= population:
+        # the population is at most twice as large as the result, so shuffling all of it is cheaper
+        indices = list(range(population))
+        rng.shuffle(indices)
+        del indices[count:]
+        return indices
+
+    return list(itertools.islice(shuffled_indices(rng, population), count))
+
+
+MASK64 = 2**64 - 1
+
+
+def mix(x):
+    """
+    Scrambles a 64-bit integer (the splitmix64 finalizer), used as a cheap keyed hash.
+    """
+    x = (x + 0x9E3779B97F4A7C15) & MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+    return x ^ (x >> 31)
+
+
+class IndexPermutation:
+    rounds = 4
+    multiplier = 0x9E3779B97F4A7C15
+
+    def __init__(self, size, rng):
+        """
+        A random permutation of range(size) that is computed on the fly in O(1) memory, using a Feistel network
+        over the smallest power of 4 that is at least size, and cycle walking to stay inside the range.
+        rng: a random.Random object
+        """
+        self.size = size
+        self.half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+        self.half_mask = (1 << self.half_bits) - 1
+        self.shift = 64 - self.half_bits
+        self.keys = [rng.getrandbits(64) for i in range(self.rounds)]
+
+    def _encrypt(self, x):
+        half_bits, half_mask, shift, multiplier = self.half_bits, self.half_mask, self.shift, self.multiplier
+        left = x >> half_bits
+        right = x & half_mask
+        for key in self.keys:
+            # multiply-shift hash of the right half as the round function
+            left, right = right, left ^ ((((right ^ key) * multiplier) & MASK64) >> shift)
+        return (left << half_bits) | right
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.size:
+            raise IndexError('permutation index out of range')
+        index = self._encrypt(index)
+        while index >= self.size:
+            index = self._encrypt(index)
+        return index
@@ -1,9 +1,15 @@
+import random
 import unittest
 
 from testcase_generator import (
     BoundedConstraint, ChoiceConstraint, CustomGeneratorConstraint, NoArgumentConstraint,
 )
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 class TestConstraints(unittest.TestCase):
     def test_choice_constraint(self):
@@ -18,6 +24,64 @@ class TestConstraints(unittest.TestCase):
         with self.assertRaisesRegex(ValueError, 'takes exactly 2 arguments.'):
             BoundedConstraint(1, 1, 1)
 
+    def test_bounded_constraint_choices(self):
+        self.assertListEqual(list(BoundedConstraint(1, 5).choices), [1, 2, 3, 4, 5])
+        choices = BoundedConstraint(1, 10**18).choices
+        self.assertEqual(choices[10**17], 10**17 + 1)
+        self.assertEqual(choices[-1], 10**18)
+        self.assertListEqual(list(choices[:3]), [1, 2, 3])
+        self.assertIn(10**9, choices)
+        self.assertEqual(BoundedConstraint(-10**20, 10**20).choice_count, 2 * 10**20 + 1)
+
+    def test_choice_constraint_sampling(self):
+        rng = random.Random(1)
+        for constraint in (BoundedConstraint(-10**20, 10**20), BoundedConstraint(1, 6), ChoiceConstraint('abcdef')):
+            with self.subTest(choices=constraint.choices):
+                self.assertIn(constraint.choice(rng), constraint.choices)
+                values = constraint.sample(6, rng=rng)
+                self.assertEqual(len(set(values)), 6)
+                self.assertTrue(all(x in constraint.choices for x in values))
+        values = BoundedConstraint(1, 3).sample(6, k=2, rng=rng)
+        self.assertListEqual(sorted(values), [1, 1, 2, 2, 3, 3])
+
+    def test_next_many(self):
+        rng = random.Random(1)
+        constraints = (
+            BoundedConstraint(-5, 5), BoundedConstraint(-10**30, 10**30),
+            BoundedConstraint(1, 2, generator=rng.uniform),
+            BoundedConstraint(1, 9, generator=lambda a, b: a), ChoiceConstraint('xyz'), ChoiceConstraint([1, 4]),
+            ChoiceConstraint('xyz', generator=lambda s: s[0]),
+        )
+        numpy_random = numpy.random.default_rng(1) if numpy is not None else None
+        for constraint in constraints:
+            for backend in (None, numpy_random):
+                with self.subTest(args=constraint.args, numpy=backend is not None):
+                    values = list(constraint.next_many(100, numpy_random=backend))
+                    self.assertEqual(len(values), 100)
+                    if isinstance(constraint, BoundedConstraint):
+                        self.assertTrue(all(constraint.min <= x <= constraint.max for x in values))
+                    else:
+                        self.assertTrue(set(values).issubset(constraint.choices))
+        self.assertListEqual(BoundedConstraint(1, 9, generator=lambda a, b: a).next_many(3), [1, 1, 1])
+        self.assertListEqual(BoundedConstraint(1, 9).next_many(0), [])
+
+    def test_next_many_large_range(self):
+        class ConstantRandom(random.Random):
+            def random(self):
+                return 0.5
+
+            def getrandbits(self, k):
+                return super().getrandbits(k)
+
+        # random.choices would only use random(), so every value would be the same
+        rng = ConstantRandom(1)
+        for constraint in (BoundedConstraint(1, 2**40, generator=rng.randint),
+                           BoundedConstraint(-10**18, 10**18, generator=rng.randint)):
+            with self.subTest(args=constraint.args):
+                values = constraint.next_many(100)
+                self.assertGreater(len(set(values)), 1)
+                self.assertTrue(all(constraint.min <= x <= constraint.max for x in values))
+
     def test_no_arguments_constraint(self):
         with self.assertRaisesRegex(ValueError, 'takes no arguments.'):
             NoArgumentConstraint(1)
@@ -1,9 +1,17 @@
+import itertools
 import random
 import unittest
+from collections import Counter
 
 from testcase_generator import (
     ArrayGenerator, BoundedConstraint, ChoiceConstraint, GraphGenerator, StringGenerator,
 )
+from testcase_generator.sampling import sample_indices
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 class TestCustomGenerators(unittest.TestCase):
@@ -34,6 +42,26 @@ class TestCustomGenerators(unittest.TestCase):
                 self.assertNotEqual(arr[0], ' ')
                 self.assertNotEqual(arr[-1], ' ')
 
+    def test_string_generator_word_lengths(self):
+        for length, min_word, max_word in ((1, 1, None), (20, 1, None), (20, 3, None), (20, 1, 2), (100, 4, 6),
+                                           (23, 5, 5), (10**5, 1, None), (10**5, 10, 20)):
+            with self.subTest(length=length, min_word=min_word, max_word=max_word):
+                s = StringGenerator(length, type='space_separated', min_word=min_word, max_word=max_word,
+                                    seed=self.SEED)
+                for i in range(5):
+                    value = s.next()
+                    self.assertEqual(len(value), length)
+                    words = value.split(' ')
+                    self.assertTrue(all(min_word <= len(word) <= (max_word or length) for word in words))
+                    self.assertTrue(all(word.isalpha() for word in words))
+        # every number of words is possible
+        s = StringGenerator(9, type='space_separated', seed=self.SEED)
+        self.assertSetEqual({len(s.next().split(' ')) for i in range(200)}, {1, 2, 3, 4, 5})
+        for min_word, max_word in ((4, 5), (0, None), (3, 2)):
+            with self.assertRaisesRegex(ValueError, 'Impossible to generate.'):
+                StringGenerator(7, type='space_separated', min_word=min_word, max_word=max_word,
+                                seed=self.SEED).next()
+
     def test_string_generator_repeating(self):
         for i in range(1, 10):
             with self.subTest(N=i):
@@ -49,6 +77,27 @@ class TestCustomGenerators(unittest.TestCase):
             with self.subTest(i=i):
                 self.assertTrue(set(s.next()).issubset('azyc'))
 
+    def test_string_generator_bulk(self):
+        for V in (None, ChoiceConstraint('01'), ChoiceConstraint('aab'), ChoiceConstraint(['x', 'y', 'z']),
+                  ChoiceConstraint('\u03b1\u03b2'), ChoiceConstraint(['ab', 'c']),
+                  ChoiceConstraint('ab', generator=lambda s: s[0])):
+            kwargs = {'V': V} if V is not None else {}
+            for length in (0, 1, 7, 3000):
+                with self.subTest(V=V and V.choices, length=length):
+                    value = StringGenerator(length, seed=self.SEED, **kwargs).next()
+                    self.assertIsInstance(value, str)
+                    choices = V.choices if V is not None else 'abcdefghijklmnopqrstuvwxyz'
+                    if V is None or all(len(c) == 1 for c in choices):
+                        self.assertEqual(len(value), length)
+                        self.assertTrue(set(value).issubset(set(choices)))
+        self.assertEqual(StringGenerator(50, seed=self.SEED).next(), StringGenerator(50, seed=self.SEED).next())
+
+        counts = Counter(StringGenerator(26 * 2000, seed=self.SEED).next())
+        self.assertEqual(len(counts), 26)
+        self.assertTrue(all(1700 <= count <= 2300 for count in counts.values()))
+        counts = Counter(StringGenerator(3000, V=ChoiceConstraint('aab'), seed=self.SEED).next())
+        self.assertTrue(1800 <= counts['a'] <= 2200)
+
     def test_string_generator_fail_validation(self):
         with self.assertRaisesRegex(ValueError, 'Unknown type aa.'):
             StringGenerator(5, type='aa', seed=self.SEED)
@@ -63,7 +112,7 @@ class TestCustomGenerators(unittest.TestCase):
     def test_array_generator_distinct(self):
         self.assertListEqual(
             ArrayGenerator(10, V=BoundedConstraint(1, 60), type='distinct', k=3, seed=self.SEED).next(),
-            [9, 37, 55, 52, 49, 5, 17, 8, 32, 49],
+            [12, 49, 7, 23, 1, 44, 41, 43, 59, 36],
         )
         self.assertListEqual(
             sorted(ArrayGenerator(100, V=BoundedConstraint(1, 100), type='distinct', seed=self.SEED).next()),
@@ -72,6 +121,34 @@ class TestCustomGenerators(unittest.TestCase):
         with self.assertRaisesRegex(ValueError, 'Impossible to generate.'):
             ArrayGenerator(10, V=BoundedConstraint(1, 4), type='distinct', k=2, seed=self.SEED).next()
 
+    def test_array_generator_distinct_multiplicity(self):
+        for numpy_backend in ((False, True) if numpy is not None else (False,)):
+            for N, V, k in ((8, BoundedConstraint(1, 4), 2), (10, ChoiceConstraint('abcdef'), 2),
+                            (1000, BoundedConstraint(-10**18, 10**18), 1), (30, BoundedConstraint(1, 10**6), 3)):
+                with self.subTest(N=N, k=k, numpy=numpy_backend):
+                    arr = ArrayGenerator(N, V=V, type='distinct', k=k, numpy=numpy_backend, seed=self.SEED).next()
+                    if numpy_backend and isinstance(V, BoundedConstraint):
+                        self.assertIsInstance(arr, numpy.ndarray)
+                    arr = list(arr)
+                    self.assertEqual(len(arr), N)
+                    self.assertLessEqual(max(Counter(arr).values()), k)
+                    if isinstance(V, BoundedConstraint):
+                        self.assertTrue(all(V.min <= x <= V.max for x in arr))
+                    else:
+                        self.assertTrue(set(arr).issubset(V.choices))
+
+    def test_sample_indices(self):
+        rng = random.Random(self.SEED)
+        for population, count in ((1, 1), (10, 0), (10, 10), (10, 3), (10**18, 1000), (2000, 999)):
+            with self.subTest(population=population, count=count):
+                indices = sample_indices(rng, population, count)
+                self.assertEqual(len(indices), count)
+                self.assertEqual(len(set(indices)), count)
+                self.assertTrue(all(0 <= i < population for i in indices))
+        self.assertListEqual(sorted(sample_indices(rng, 1000, 1000)), list(range(1000)))
+        with self.assertRaisesRegex(ValueError, 'Cannot sample'):
+            sample_indices(rng, 5, 6)
+
     def test_array_generator_palindrome(self):
         s = ArrayGenerator(100, V=BoundedConstraint(1, 100), type='palindrome', seed=self.SEED)
         for i in range(10):
@@ -94,6 +171,225 @@ class TestCustomGenerators(unittest.TestCase):
                     edges += 1
                 self.assertEqual(edges, i * (i - 1) // 2)
 
+    def _graph_edges(self, generator):
+        edges = []
+        edge = generator.next()
+        while edge is not None:
+            edges.append(edge)
+            edge = generator.next()
+        return edges
+
+    def test_graph_generator_no_duplicates(self):
+        for type, M in ((1, 400), (2, 400), (1, 435)):
+            with self.subTest(type=type, M=M):
+                edges = self._graph_edges(GraphGenerator(30, type=type, M=M, seed=self.SEED))
+                self.assertEqual(len(edges), M)
+                self.assertEqual(len({(min(u, v), max(u, v)) for u, v in edges}), M)
+                self.assertTrue(all(u != v and 1 <= u <= 30 and 1 <= v <= 30 for u, v in edges))
+        edges = self._graph_edges(GraphGenerator(3, type=1, M=50, duplicates=True, self_loops=True, seed=self.SEED))
+        self.assertEqual(len(edges), 50)
+
+    def test_graph_generator_dense(self):
+        for type, self_loops, streaming in ((1, False, False), (1, True, False), (2, False, False), (2, True, False),
+                                            (3, False, True), (3, True, True)):
+            with self.subTest(type=type, self_loops=self_loops, streaming=streaming):
+                N = 300
+                M = N * (N + 1) // 2 if self_loops else N * (N - 1) // 2
+                s = GraphGenerator(N, type=type, M=M if type != 3 else None, self_loops=self_loops,
+                                   streaming=streaming, seed=self.SEED)
+                edges = self._graph_edges(s)
+                self.assertEqual(len(edges), M)
+                self.assertEqual(len({(min(u, v), max(u, v)) for u, v in edges}), M)
+        with self.assertRaisesRegex(ValueError, 'Impossible graph.'):
+            GraphGenerator(5, type=1, M=11, seed=self.SEED)
+        with self.assertRaisesRegex(ValueError, 'Impossible graph.'):
+            GraphGenerator(1, type=1, M=1, duplicates=True, seed=self.SEED)
+        s = GraphGenerator(10**5, type=3, streaming=True, seed=self.SEED)
+        self.assertEqual(s.edge_count, 10**5 * (10**5 - 1) // 2)
+        edges = [s.next() for i in range(10)]
+        self.assertTrue(all(u != v for u, v in edges))
+
+    def test_graph_generator_pairs(self):
+        for self_loops in (False, True):
+            s = GraphGenerator(30, type=1, M=0, self_loops=self_loops, seed=self.SEED)
+            pairs = [s._pair(i) for i in range(s.pair_count)]
+            self.assertEqual(len(set(pairs)), s.pair_count)
+            for i, (a, b) in enumerate(pairs):
+                self.assertTrue(0 <= a <= b < 30 and (self_loops or a < b))
+                self.assertEqual(s._pair_index(b, a), i)
+
+    def test_graph_generator_trees(self):
+        for type, N, streaming in itertools.product((10, 11, 12, 13, 14), (1, 2, 50), (False, True)):
+            with self.subTest(type=type, N=N, streaming=streaming):
+                edges = self._graph_edges(GraphGenerator(N, type=type, streaming=streaming, seed=self.SEED))
+                self.assertEqual(len(edges), N - 1)
+                # union-find to check that the edges form a tree
+                parent = list(range(N + 1))
+
+                def find(x):
+                    while parent[x] != x:
+                        x = parent[x]
+                    return x
+                for u, v in edges:
+                    self.assertNotEqual(find(u), find(v))
+                    parent[find(u)] = find(v)
+
+    def _tree_distances(self, edges, N, source):
+        adjacency = [[] for i in range(N + 1)]
+        for u, v in edges:
+            adjacency[u].append(v)
+            adjacency[v].append(u)
+        distances = [-1] * (N + 1)
+        distances[source] = 0
+        queue = [source]
+        for u in queue:
+            for v in adjacency[u]:
+                if distances[v] == -1:
+                    distances[v] = distances[u] + 1
+                    queue.append(v)
+        self.assertEqual(len(queue), N)
+        return distances
+
+    def test_graph_generator_shaped_trees(self):
+        for N in (1, 2, 3, 50, 1000):
+            for type, kwargs in ((15, {}), (16, {'diameter': min(N - 1, 2)}), (16, {'diameter': (N - 1) // 2 + 1}),
+                                 (16, {'diameter': N - 1}), (17, {'depth': min(N - 1, 1)}),
+                                 (17, {'depth': N // 3 + 1}), (18, {'max_degree': 2}), (18, {'max_degree': 3})):
+                if N == 1:
+                    kwargs = {key: 0 if key != 'max_degree' else value for key, value in kwargs.items()}
+                with self.subTest(N=N, type=type, **kwargs):
+                    s = GraphGenerator(N, type=type, seed=self.SEED, **kwargs)
+                    edges = self._graph_edges(s)
+                    self.assertEqual(len(edges), N - 1)
+                    self.assertEqual(len({(min(u, v), max(u, v)) for u, v in edges}), N - 1)
+                    if N == 1:
+                        continue
+                    distances = self._tree_distances(edges, N, edges[0][0])
+                    if type == 16:
+                        end = distances.index(max(distances))
+                        self.assertEqual(max(self._tree_distances(edges, N, end)), kwargs['diameter'])
+                    elif type == 17:
+                        self.assertEqual(max(self._tree_distances(edges, N, s.root)), kwargs['depth'])
+                    elif type == 18:
+                        degrees = Counter(node for edge in edges for node in edge)
+                        self.assertEqual(max(degrees.values()), min(N - 1, kwargs['max_degree']))
+
+        for type, kwargs in ((16, {'diameter': 1}), (16, {'diameter': 10}), (17, {'depth': 0}),
+                             (18, {'max_degree': 1})):
+            with self.assertRaisesRegex(ValueError, 'Impossible graph.'):
+                GraphGenerator(10, type=type, seed=self.SEED, **kwargs)
+        with self.assertRaisesRegex(ValueError, 'diameter must be specified.'):
+            GraphGenerator(10, type=16, seed=self.SEED)
+
+    def test_graph_generator_uniform_tree(self):
+        # there are 4^2 labelled trees with 4 nodes, which should be equally likely
+        counts = Counter()
+        for i in range(3200):
+            edges = self._graph_edges(GraphGenerator(4, type=15, seed=i))
+            counts[frozenset((min(u, v), max(u, v)) for u, v in edges)] += 1
+        self.assertEqual(len(counts), 16)
+        self.assertTrue(all(140 <= count <= 260 for count in counts.values()))
+
+    def test_graph_generator_bulk_export(self):
+        backends = (False, True) if numpy is not None else (False,)
+        for type, kwargs, streaming, as_numpy in itertools.product(
+                (1, 3, 11), ({'M': 200},), (False, True), backends):
+            if streaming and type == 1:
+                continue
+            with self.subTest(type=type, streaming=streaming, numpy=as_numpy):
+                N = 30
+                kwargs = kwargs if type == 1 else {}
+                expected = sorted(map(sorted, self._graph_edges(
+                    GraphGenerator(N, type=type, streaming=streaming, seed=self.SEED, **kwargs))))
+
+                us, vs = GraphGenerator(N, type=type, streaming=streaming, seed=self.SEED, **kwargs).edge_arrays(
+                    as_numpy=as_numpy)
+                self.assertListEqual(sorted(sorted(edge) for edge in zip(us, vs)), expected)
+
+                s = GraphGenerator(N, type=type, streaming=streaming, seed=self.SEED, **kwargs)
+                offsets, targets = s.csr(as_numpy=as_numpy)
+                self.assertIsNone(s.next())
+                self.assertEqual(len(offsets), N + 1)
+                self.assertEqual(len(targets), 2 * len(expected))
+                edges = sorted([u, v] for u in range(1, N + 1) for v in targets[offsets[u - 1]:offsets[u]] if u < v)
+                self.assertListEqual(edges, expected)
+
+    def test_graph_generator_parent_array(self):
+        backends = (False, True) if numpy is not None else (False,)
+        for type, as_numpy in itertools.product((10, 11, 15, 17), backends):
+            with self.subTest(type=type, numpy=as_numpy):
+                N = 100
+                kwargs = {'depth': 7} if type == 17 else {}
+                edges = self._graph_edges(GraphGenerator(N, type=type, seed=self.SEED, **kwargs))
+                s = GraphGenerator(N, type=type, seed=self.SEED, **kwargs)
+                root = s.root or 5
+                parents = s.parent_array(root if type != 17 else None, as_numpy=as_numpy)
+                self.assertEqual(len(parents), N + 1)
+                self.assertEqual(parents[root], 0)
+                self.assertListEqual(sorted(sorted((x, int(parents[x]))) for x in range(1, N + 1) if x != root),
+                                     sorted(map(sorted, edges)))
+                if type == 17:
+                    self.assertEqual(max(self._tree_distances(edges, N, root)), 7)
+
+        with self.assertRaisesRegex(ValueError, 'not a tree'):
+            GraphGenerator(10, type=1, M=9, seed=self.SEED).parent_array()
+        with self.assertRaisesRegex(ValueError, 'not a tree'):
+            GraphGenerator(10, type=4, seed=self.SEED).parent_array()
+
+    def test_graph_generator_weights(self):
+        def W():
+            # a separate generator for the weights, so that every graph gets the same weights
+            return BoundedConstraint(1, 10**9, generator=random.Random(self.SEED).randint)
+
+        for type, kwargs, streaming in ((1, {'M': 200}, False), (11, {}, False), (11, {}, True), (3, {}, True)):
+            with self.subTest(type=type, streaming=streaming):
+                unweighted = self._graph_edges(GraphGenerator(30, type=type, streaming=streaming, seed=self.SEED,
+                                                              **kwargs))
+                edges = self._graph_edges(GraphGenerator(30, type=type, streaming=streaming, W=W(), seed=self.SEED,
+                                                         **kwargs))
+                self.assertTrue(all(len(edge) == 3 and 1 <= edge[2] <= 10**9 for edge in edges))
+                # the weights do not change the graph
+                self.assertListEqual(sorted(map(sorted, (edge[:2] for edge in edges))), sorted(map(sorted, unweighted)))
+                self.assertGreater(len({edge[2] for edge in edges}), len(edges) // 2)
+
+                backends = (False, True) if numpy is not None else (False,)
+                for as_numpy in backends:
+                    s = GraphGenerator(30, type=type, streaming=streaming, W=W(), seed=self.SEED, **kwargs)
+                    us, vs, ws = s.edge_arrays(as_numpy=as_numpy)
+                    self.assertListEqual(sorted((min(e[:2]), max(e[:2]), e[2]) for e in zip(us, vs, ws)),
+                                         sorted((min(e[:2]), max(e[:2]), e[2]) for e in edges))
+                    s = GraphGenerator(30, type=type, streaming=streaming, W=W(), seed=self.SEED, **kwargs)
+                    offsets, targets, weights = s.csr(as_numpy=as_numpy)
+                    self.assertListEqual(sorted((u, v, w) for u in range(1, 31)
+                                                for v, w in zip(targets[offsets[u - 1]:offsets[u]],
+                                                                weights[offsets[u - 1]:offsets[u]]) if u < v),
+                                         sorted((min(e[:2]), max(e[:2]), e[2]) for e in edges))
+
+        edges = self._graph_edges(GraphGenerator(5, type=10, W=ChoiceConstraint('ab'), seed=self.SEED))
+        self.assertTrue(all(edge[2] in 'ab' for edge in edges))
+
+    def test_graph_generator_shortest_path_weights(self):
+        s = GraphGenerator(500, type=1, M=2000, W=BoundedConstraint(1, 10**9), weights='shortest_path',
+                           seed=self.SEED)
+        positions = {node: i for i, node in enumerate(s.nodes)}
+        edges = self._graph_edges(s)
+        # heavier edges join nodes that are further apart in the hidden order
+        edges.sort(key=lambda edge: abs(positions[edge[0]] - positions[edge[1]]))
+        self.assertListEqual([edge[2] for edge in edges], sorted(edge[2] for edge in edges))
+        self.assertTrue(all(1 <= edge[2] <= 10**9 for edge in edges))
+
+        with self.assertRaisesRegex(ValueError, 'Unknown weights'):
+            GraphGenerator(5, type=10, W=BoundedConstraint(1, 5), weights='spfa', seed=self.SEED)
+        with self.assertRaisesRegex(ValueError, 'require W'):
+            GraphGenerator(5, type=10, weights='shortest_path', seed=self.SEED)
+        with self.assertRaisesRegex(ValueError, 'require W'):
+            GraphGenerator(5, type=10, W=BoundedConstraint(1, 5), weights='shortest_path', streaming=True,
+                           seed=self.SEED)
+        with self.assertRaisesRegex(ValueError, '64-bit integers'):
+            GraphGenerator(5, type=10, W=ChoiceConstraint('ab'), weights='shortest_path', seed=self.SEED)
+        with self.assertRaisesRegex(ValueError, 'W must be a ChoiceConstraint'):
+            GraphGenerator(5, type=10, W=5, seed=self.SEED)
+
     def test_graph_generator_complete(self):
         for i in range(1, 11):
             with self.subTest(N=i):
@@ -112,6 +408,19 @@ class TestCustomGenerators(unittest.TestCase):
                     edges += 1
                 self.assertEqual(edges, i)
 
+    def test_graph_generator_streaming(self):
+        for N in range(3, 12):
+            with self.subTest(N=N):
+                edges = self._graph_edges(GraphGenerator(N, type=4, streaming=True, seed=self.SEED))
+                self.assertEqual(len(edges), N)
+                self.assertTrue(all(Counter(node for edge in edges for node in edge)[x] == 2 for x in range(1, N + 1)))
+        # the edge order and orientation are random
+        edges = self._graph_edges(GraphGenerator(1000, type=10, streaming=True, seed=self.SEED))
+        self.assertGreater(sum(u < v for u, v in edges), 400)
+        self.assertLess(sum(u < v for u, v in edges), 600)
+        with self.assertRaisesRegex(ValueError, 'cannot be streamed'):
+            GraphGenerator(10, type=1, M=5, streaming=True, seed=self.SEED)
+
     def test_graph_generator_fail_validation(self):
         with self.assertRaisesRegex(ValueError, 'Unknown graph type.'):
             GraphGenerator(1, type=0, seed=self.SEED)
@@ -121,3 +430,33 @@ class TestCustomGenerators(unittest.TestCase):
             GraphGenerator(3, type=2, M=1, seed=self.SEED)
         with self.assertRaises(ValueError):
             GraphGenerator(10**100, type=3, seed=self.SEED)
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed.')
+    def test_array_generator_numpy(self):
+        for V in (BoundedConstraint(-10, 10), BoundedConstraint(-1.5, 1.5, generator=random.uniform),
+                  ChoiceConstraint((2, 3, 5, 7)), BoundedConstraint(1, 5, generator=lambda a, b: a)):
+            for type in ('standard', 'sorted', 'palindrome'):
+                with self.subTest(V=V, type=type):
+                    s = ArrayGenerator(BoundedConstraint(1, 21), V=V, type=type, numpy=True, seed=self.SEED)
+                    for i in range(5):
+                        arr = list(s.next())
+                        self.assertGreaterEqual(len(arr), 1)
+                        if isinstance(V, BoundedConstraint):
+                            self.assertTrue(all(V.min <= x <= V.max for x in arr))
+                        else:
+                            self.assertTrue(set(arr).issubset(V.choices))
+                        if type == 'sorted':
+                            self.assertListEqual(arr, sorted(arr))
+                        elif type == 'palindrome':
+                            self.assertListEqual(arr, arr[::-1])
+
+        # sparse samples must not go through numpy's choice, which would shuffle the whole range of V
+        s = ArrayGenerator(10**4, V=BoundedConstraint(1, 10**12), type='distinct', numpy=True, seed=self.SEED)
+        arr = s.next()
+        self.assertEqual(len(numpy.unique(arr)), 10**4)
+        self.assertTrue(1 <= arr.min() <= arr.max() <= 10**12)
+
+        self.assertListEqual(
+            ArrayGenerator(10, V=BoundedConstraint(1, 10**9), numpy=True, seed=self.SEED).next().tolist(),
+            ArrayGenerator(10, V=BoundedConstraint(1, 10**9), numpy=True, seed=self.SEED).next().tolist(),
+        )
@@ -0,0 +1,69 @@
+import io
+import unittest
+
+from testcase_generator import Lines
+from testcase_generator.formatter import LineWriter
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def format_reference(lines):
+    out = io.StringIO()
+    for line in lines:
+        try:
+            iter(line)
+        except TypeError:
+            line = str(line)
+        else:
+            if not isinstance(line, str):
+                line = ' '.join(map(str, line))
+        out.write(line + '\n')
+    return out.getvalue()
+
+
+def format_lines(lines, chunk_lines=4096):
+    out = io.StringIO()
+    writer = LineWriter(out, chunk_lines=chunk_lines)
+    for line in lines:
+        writer.write(line)
+    writer.flush()
+    return out.getvalue()
+
+
+class TestFormatter(unittest.TestCase):
+    def test_lines(self):
+        def lines():
+            return [1, 2.5, 'a b', '', (1, 2), [3, 4, 5], [], range(3), {7: 8}, True, None, (x for x in 'xyz'), -0.0]
+
+        for chunk_lines in (1, 2, 4096):
+            with self.subTest(chunk_lines=chunk_lines):
+                self.assertEqual(format_lines(lines(), chunk_lines), format_reference(lines()))
+
+    def test_block(self):
+        edges = [(i, i + 1) for i in range(100)]
+        self.assertEqual(format_lines([100, Lines(edges), 'end']), format_reference([100] + edges + ['end']))
+        self.assertEqual(format_lines([Lines(range(10))]), format_reference(range(10)))
+        self.assertEqual(format_lines([Lines([]), Lines(['']), 1]), format_reference(['', 1]))
+
+    def test_line_count(self):
+        out = io.StringIO()
+        writer = LineWriter(out, chunk_lines=2)
+        for line in [1, 'a\nb', Lines(range(5)), (1, 2), Lines([]), '']:
+            writer.write(line)
+        writer.flush()
+        self.assertEqual(writer.lines, 10)
+        self.assertEqual(writer.lines, out.getvalue().count('\n'))
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed.')
+    def test_numpy(self):
+        array = numpy.arange(-50, 50, dtype=numpy.int64)
+        floats = numpy.linspace(0, 1, 7)
+        matrix = array.reshape(10, 10)
+        small_floats = numpy.array([0.1, 2.5], dtype=numpy.float32)
+        self.assertEqual(
+            format_lines([array, floats, Lines(matrix), small_floats, Lines(array)]),
+            format_reference([array, floats] + list(matrix) + [small_floats] + list(array)),
+        )
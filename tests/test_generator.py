@@ -1,12 +1,24 @@
+import io
+import json
 import os
 import random
+import shutil
+import tarfile
 import tempfile
 import unittest
+import zipfile
+from unittest import mock
 
 from testcase_generator import (
-    Batch, BoundedConstraint, Case, CustomGeneratorConstraint, Generator, GraphGenerator,
+    ArchiveWriter, Batch, BoundedConstraint, BuildCache, Case, CaseGenerationError, ConstraintParser,
+    CustomGeneratorConstraint, Generator, GraphGenerator, NumpyRandom, StringGenerator,
 )
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 class TestGenerator(unittest.TestCase):
     SEED = 1
@@ -26,6 +38,30 @@ class TestGenerator(unittest.TestCase):
         Case.SET_INPUT = None
         Batch.CASES_DIR = self._old_cases_dir
 
+    def _read_cases(self):
+        files = {}
+        for root, dirs, filenames in os.walk(Batch.CASES_DIR):
+            for filename in filenames:
+                with open(os.path.join(root, filename)) as f:
+                    files[os.path.relpath(os.path.join(root, filename), Batch.CASES_DIR)] = f.read()
+        return files
+
+    def _set_graph_case(self):
+        def set_constraints(this):
+            this.N = BoundedConstraint(1, 200)
+            this.E = CustomGeneratorConstraint(generator=GraphGenerator)
+            this.T = BoundedConstraint(10, 14)
+
+        def generate_input(self, **kwargs):
+            n = self.N.next
+            yield n, random.randint(1, 10**9)
+            self.E.initialize(N=n, type=self.T.next)
+            for i in range(n - 1):
+                yield self.E.next
+
+        Case.SET_CONSTRAINTS = set_constraints
+        Case.SET_INPUT = generate_input
+
     def test_case_functions_not_set(self):
         with self.assertRaisesRegex(ValueError, 'Case.SET_INPUT is not set to a function.'):
             Case()
@@ -33,6 +69,51 @@ class TestGenerator(unittest.TestCase):
         with self.assertRaisesRegex(ValueError, 'Case.SET_CONSTRAINTS is not set to a function.'):
             Case()
 
+    def test_case_template(self):
+        calls = []
+
+        def set_constraints(this):
+            calls.append(this)
+            this.N = BoundedConstraint(1, 100)
+            this.S = CustomGeneratorConstraint(generator=StringGenerator)
+            this.LIMIT = 5
+
+        def generate_input(self, **kwargs):
+            yield self.N.next
+
+        Case.SET_CONSTRAINTS = set_constraints
+        Case.SET_INPUT = generate_input
+
+        M = BoundedConstraint(1, 3)
+        cases = [Case({'M': M}) for i in range(1000)]
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cases[0].LIMIT, 5)
+        self.assertListEqual(list(cases[0].dict), ['N', 'S', 'M'])
+        self.assertIs(cases[0].get('N'), cases[0].N)
+        with self.assertRaises(KeyError):
+            cases[0].get('LIMIT')
+
+        # every case changes its own copy of the constraints
+        cases[0].N.set_max(10)
+        cases[0].M.set_min(2)
+        self.assertTupleEqual(cases[0].N.args, (1, 10))
+        self.assertTupleEqual(cases[1].N.args, (1, 100))
+        self.assertTupleEqual(cases[1].M.args, (1, 3))
+        self.assertTupleEqual(M.args, (1, 3))
+        self.assertTupleEqual(Case.get_global('N').args, (1, 100))
+        cases[0].reset()
+        self.assertTupleEqual(cases[0].N.args, (1, 100))
+
+        # constraints copied after set_random still use the random generator of the case
+        rng = random.Random(1)
+        cases[1].set_random(rng)
+        self.assertIs(cases[1].N.generator.__self__, rng)
+        self.assertIs(cases[1].S.random, rng)
+
+        Case.SET_CONSTRAINTS = lambda this: set_constraints(this)
+        Case()
+        self.assertEqual(len(calls), 2)
+
     def test_generator_basic(self):
         def set_constraints(this):
             this.N = BoundedConstraint(1, 100)
@@ -136,3 +217,536 @@ class TestGenerator(unittest.TestCase):
                 with open(os.path.join(x.location, '{}.in'.format(case))) as f:
                     data = f.read().split('\n')
                     self.assertEqual(len(data), int(data[0].split()[1]) + 2)  # account of ending newline + initial line
+
+    def test_generator_parallel(self):
+        self._set_graph_case()
+        batches = [
+            Batch(num=1, cases=[Case() for i in range(8)]),
+            Batch(num=2, cases=[Case(N=BoundedConstraint(1, 10)) for i in range(5)], start=3),
+        ]
+        Generator(batches=batches, seed=42).start()
+        serial = self._read_cases()
+        self.assertEqual(len(serial), 13)
+
+        shutil.rmtree(Batch.CASES_DIR)
+        for x in batches:
+            os.makedirs(x.location)
+        Generator(batches=batches, jobs=3, seed=42).start()
+        self.assertDictEqual(self._read_cases(), serial)
+
+    def test_generator_parallel_error(self):
+        def set_constraints(this):
+            this.N = BoundedConstraint(1, 10)
+
+        def generate_input(self, **kwargs):
+            yield self.N.next
+            if kwargs['batch'] == 2:
+                raise ValueError('bad case')
+
+        Case.SET_CONSTRAINTS = set_constraints
+        Case.SET_INPUT = generate_input
+
+        for jobs in (1, 2):
+            with self.subTest(jobs=jobs):
+                batches = [
+                    Batch(num=1, cases=[Case() for i in range(3)]),
+                    Batch(num=2, cases=[Case()], start=7),
+                ]
+                with self.assertRaisesRegex(CaseGenerationError, 'Batch 2, case 7: ValueError: bad case') as e:
+                    Generator(batches=batches, jobs=jobs).start()
+                self.assertEqual(e.exception.batch, 2)
+                self.assertEqual(e.exception.case, 7)
+
+    def test_generator_solution(self):
+        def set_constraints(this):
+            this.N = BoundedConstraint(1, 10)
+
+        def generate_input(self, **kwargs):
+            yield self.N.next, kwargs['batch']
+
+        Case.SET_CONSTRAINTS = set_constraints
+        Case.SET_INPUT = generate_input
+
+        batches = [Batch(num=1, cases=[Case() for i in range(6)])]
+        generator = Generator(batches=batches, exe='cat', solution_jobs=2)
+        generator.start()
+        self.assertEqual(len(generator.results), 6)
+        self.assertTrue(all(result.ok for result in generator.results))
+        for i in range(6):
+            with open(batches[0].filename(i) + '.in') as f_in, open(batches[0].filename(i) + '.out') as f_out:
+                self.assertEqual(f_in.read(), f_out.read())
+
+    def test_generator_solution_failure(self):
+        def set_constraints(this):
+            this.N = BoundedConstraint(1, 10)
+
+        def generate_input(self, **kwargs):
+            yield self.N.next
+
+        Case.SET_CONSTRAINTS = set_constraints
+        Case.SET_INPUT = generate_input
+
+        batches = [Batch(num=1, cases=[Case() for i in range(2)])]
+        generator = Generator(batches=batches, exe='sh -c "exit 3"')
+        with self.assertLogs('testcase_generator.runner', level='WARNING'):
+            generator.start()
+        self.assertListEqual([result.returncode for result in generator.results], [3, 3])
+        self.assertFalse(any(result.timed_out for result in generator.results))
+
+        generator = Generator(batches=batches, exe=['sleep', '10'], timeout=0.2, jobs=2)
+        with self.assertLogs('testcase_generator.runner', level='WARNING'):
+            generator.start()
+        self.assertTrue(all(result.timed_out for result in generator.results))
+        self.assertTrue(all(result.wall_time < 5 for result in generator.results))
+
+        with self.assertRaisesRegex(CaseGenerationError, 'Batch 1, case 0: FileNotFoundError'):
+            Generator(batches=batches, exe='./does-not-exist').start()
+
+    def test_generator_stream(self):
+        def set_constraints(this):
+            this.N = BoundedConstraint(2 * 10**4, 5 * 10**4)
+
+        def generate_input(self, **kwargs):
+            n = self.N.next
+            yield n
+            for i in range(n):
+                yield i, random.randint(1, 10**9)
+
+        Case.SET_CONSTRAINTS = set_constraints
+        Case.SET_INPUT = generate_input
+
+        for jobs in (1, 2):
+            for exe in ('cat', 'head -n 1'):
+                with self.subTest(jobs=jobs, exe=exe):
+                    batches = [Batch(num=1, cases=[Case() for i in range(3)])]
+                    generator = Generator(batches=batches, exe=exe, jobs=jobs, stream=True, seed=3)
+                    generator.start()
+                    self.assertEqual(len(generator.results), 3)
+                    self.assertTrue(all(result.ok for result in generator.results))
+                    for i in range(3):
+                        filename = batches[0].filename(i)
+                        with open(filename + '.in') as f_in, open(filename + '.out') as f_out:
+                            data = f_in.read()
+                            self.assertEqual(len(data.split('\n')), int(data.split('\n')[0]) + 2)
+                            if exe == 'cat':
+                                self.assertEqual(data, f_out.read())
+                            else:
+                                self.assertEqual(data.split('\n')[0] + '\n', f_out.read())
+
+    def test_generator_stream_solution_jobs(self):
+        def set_constraints(this):
+            this.N = BoundedConstraint(1, 10)
+
+        def generate_input(self, **kwargs):
+            yield self.N.next
+
+        Case.SET_CONSTRAINTS = set_constraints
+        Case.SET_INPUT = generate_input
+
+        log = os.path.join(self._temp_dir.name, 'solutions.log')
+        exe = ['sh', '-c', 'echo start >> {0}; cat; sleep 0.1; echo end >> {0}'.format(log)]
+        for jobs in (1, 3):
+            with self.subTest(jobs=jobs):
+                batches = [Batch(num=1, cases=[Case() for i in range(4)])]
+                generator = Generator(batches=batches, exe=exe, jobs=jobs, stream=True, solution_jobs=1, seed=3)
+                generator.start()
+                self.assertTrue(all(result.ok for result in generator.results))
+                # the solutions never overlap
+                with open(log) as f:
+                    self.assertEqual(f.read().split(), ['start', 'end'] * 4)
+                os.remove(log)
+
+    def _set_seeded_case(self):
+        def set_constraints(this):
+            this.N = BoundedConstraint(1, 50)
+            this.S = CustomGeneratorConstraint(generator=StringGenerator)
+            this.E = CustomGeneratorConstraint(generator=GraphGenerator)
+
+        def generate_input(self, **kwargs):
+            n = self.N.next
+            yield n, self.random.randint(1, 10**9)
+            self.S.initialize(N=n)
+            yield self.S.next
+            self.E.initialize(N=n, type=11)
+            for i in range(n - 1):
+                yield self.E.next
+
+        Case.SET_CONSTRAINTS = set_constraints
+        Case.SET_INPUT = generate_input
+
+    def test_generator_case_seed(self):
+        self._set_seeded_case()
+        batches = [Batch(num=1, cases=[Case() for i in range(6)])]
+        Generator(batches=batches, seed=7).start()
+        files = self._read_cases()
+        self.assertEqual(len(set(files.values())), 6)
+
+        # each case can be regenerated on its own
+        for case_num in (4, 1):
+            os.remove(batches[0].filename(case_num) + '.in')
+            batches[0].run_case(case_num, Case(), None, 7)
+        self.assertDictEqual(self._read_cases(), files)
+
+        Generator(batches=batches, seed=8).start()
+        self.assertNotEqual(self._read_cases(), files)
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed.')
+    def test_generator_numpy_random(self):
+        self._set_seeded_case()
+        batches = [Batch(num=1, cases=[Case() for i in range(4)])]
+        Generator(batches=batches, seed=7, random_class=NumpyRandom).start()
+        files = self._read_cases()
+        Generator(batches=batches, seed=7, random_class=NumpyRandom, jobs=2).start()
+        self.assertDictEqual(self._read_cases(), files)
+
+    def test_generator_regenerate(self):
+        self._set_seeded_case()
+        parser = ConstraintParser('''\
+        - batch: 1
+          cases:
+            - constraints: {N: ~10}
+              repeat: 3
+        - batch: 2
+          start: 4
+          cases:
+            - constraints: {}
+              repeat: 4
+        ''')
+        parser.parse()
+        Generator(batches=parser.batches, exe='cat', seed=11).start()
+        files = self._read_cases()
+        self.assertEqual(len(files), 14)
+
+        for name in ('batch1/0.in', 'batch1/2.out', 'batch2/5.in', 'batch2/5.out', 'batch2/7.in'):
+            with open(os.path.join(Batch.CASES_DIR, name), 'w') as f:
+                f.write('changed\n')
+        generator = Generator(batches=parser.batches, exe='cat', seed=11)
+        generator.regenerate(2, [5, 7])
+        self.assertListEqual([(result.batch, result.case) for result in generator.results], [(2, 5), (2, 7)])
+        Generator(batches=parser.batches, exe='cat', seed=11, jobs=2).start({1: None})
+        self.assertDictEqual(self._read_cases(), files)
+
+        with self.assertRaisesRegex(ValueError, 'Unknown batch 3.'):
+            generator.regenerate(3)
+        with self.assertRaisesRegex(ValueError, 'Unknown case 8 in batch 2.'):
+            generator.regenerate(2, [8])
+        with self.assertRaisesRegex(ValueError, 'A seed must be set'):
+            Generator(batches=parser.batches).regenerate(1)
+
+    def test_generator_regenerate_mutated_constraints(self):
+        def set_constraints(this):
+            this.N = BoundedConstraint(1, 10**9)
+
+        def generate_input(self, **kwargs):
+            n = self.N.next
+            yield n
+            # later values depend on the earlier ones
+            self.N.set_min(n)
+            yield self.N.next
+
+        Case.SET_CONSTRAINTS = set_constraints
+        Case.SET_INPUT = generate_input
+
+        batches = [Batch(num=1, cases=[Case() for i in range(3)])]
+        generator = Generator(batches=batches, seed=5)
+        generator.start()
+        files = self._read_cases()
+        self.assertTupleEqual(batches[0].cases[0].N.args, (1, 10**9))
+        for jobs in (1, 2):
+            with self.subTest(jobs=jobs):
+                generator = Generator(batches=batches, seed=5, jobs=jobs)
+                generator.regenerate(1, [0, 2])
+                generator.regenerate(1, [2])
+                self.assertDictEqual(self._read_cases(), files)
+
+    def test_generator_cache(self):
+        self._set_seeded_case()
+
+        def make_batches():
+            return [
+                Batch(num=1, cases=[Case() for i in range(3)]),
+                Batch(num=2, cases=[Case({'N': BoundedConstraint(1, 5)})]),
+            ]
+
+        batches = make_batches()
+
+        def start(exe='cat', **kwargs):
+            generator = Generator(batches=batches, exe=exe, seed=3, cache=True, **kwargs)
+            generator.start()
+            return sorted((result.batch, result.case) for result in generator.results)
+
+        def read_cases():
+            files = self._read_cases()
+            self.assertIn(BuildCache.FILENAME, files)
+            del files[BuildCache.FILENAME]
+            return files
+
+        self.assertListEqual(start(), [(1, 0), (1, 1), (1, 2), (2, 0)])
+        files = read_cases()
+        # up to date cases are skipped, even if their files were changed since
+        with open(batches[0].filename(1) + '.in', 'w') as f:
+            f.write('changed\n')
+        self.assertListEqual(start(jobs=2), [])
+        self.assertEqual(read_cases()['batch1/1.in'], 'changed\n')
+        os.remove(batches[0].filename(1) + '.in')
+        self.assertListEqual(start(), [(1, 1)])
+        self.assertDictEqual(read_cases(), files)
+
+        # only the outputs depend on the solution
+        self.assertListEqual(start(['sh', '-c', 'cat']), [(1, 0), (1, 1), (1, 2), (2, 0)])
+        os.remove(batches[1].filename(0) + '.out')
+        self.assertListEqual(start(['sh', '-c', 'cat']), [(2, 0)])
+        self.assertDictEqual(read_cases(), files)
+
+        # failed solutions are rerun
+        self.assertListEqual(start('false'), [(1, 0), (1, 1), (1, 2), (2, 0)])
+        self.assertListEqual(start('false'), [(1, 0), (1, 1), (1, 2), (2, 0)])
+
+        generate_input = Case.SET_INPUT
+
+        def set_input(self, **kwargs):
+            yield 1
+            yield from generate_input(self, **kwargs)
+
+        Case.SET_INPUT = set_input
+        batches = make_batches()
+        self.assertListEqual(start(), [(1, 0), (1, 1), (1, 2), (2, 0)])
+        self.assertEqual(read_cases()['batch2/0.in'], '1\n' + files['batch2/0.in'])
+
+        with self.assertRaisesRegex(ValueError, 'A seed must be set to use the cache.'):
+            Generator(batches=batches, cache=True).start()
+
+    def test_generator_atomic_writes(self):
+        def set_constraints(this):
+            this.N = BoundedConstraint(1, 10)
+
+        def generate_input(self, **kwargs):
+            yield self.N.next
+            if kwargs['batch'] == 2:
+                raise ValueError('failed')
+
+        Case.SET_CONSTRAINTS = set_constraints
+        Case.SET_INPUT = generate_input
+
+        batch = Batch(num=1, cases=[Case() for i in range(2)])
+        with self.assertLogs('testcase_generator.runner', level='WARNING'):
+            batch.run(['sh', '-c', 'cat; exit 1'])
+        self.assertListEqual(sorted(os.listdir(batch.location)), ['0.in', '1.in'])
+
+        for stream in (False, True):
+            with self.subTest(stream=stream):
+                batch = Batch(num=2, cases=[Case()])
+                with self.assertRaises(CaseGenerationError):
+                    batch.run('cat', stream=stream)
+                self.assertListEqual(os.listdir(batch.location), [])
+
+    def test_generator_resume(self):
+        calls = []
+
+        def set_constraints(this):
+            this.N = BoundedConstraint(1, 10)
+
+        def generate_input(self, **kwargs):
+            if self is interrupted_case:
+                raise ValueError('interrupted')
+            calls.append(self.N.next)
+            yield calls[-1]
+
+        Case.SET_CONSTRAINTS = set_constraints
+        Case.SET_INPUT = generate_input
+
+        batches = [Batch(num=1, cases=[Case() for i in range(3)]), Batch(num=2, cases=[Case() for i in range(3)])]
+        interrupted_case = None
+        Generator(batches=batches, exe='cat', seed=9).start()
+        files = self._read_cases()
+        journal = os.path.join(self._temp_dir.name, 'cases.journal')
+
+        for jobs, stream in ((1, False), (1, True), (2, False), (2, True)):
+            with self.subTest(jobs=jobs, stream=stream):
+                shutil.rmtree(Batch.CASES_DIR)
+                interrupted_case = batches[1].cases[1]
+                with self.assertRaises(CaseGenerationError):
+                    Generator(batches=batches, exe='cat', seed=9, jobs=jobs, stream=stream).start()
+                self.assertTrue(os.path.exists(journal))
+                # the last record was cut short by the interruption
+                with open(journal, 'a') as f:
+                    f.write('[2, 1, "in')
+
+                interrupted_case = None
+                calls.clear()
+                generator = Generator(batches=batches, exe='cat', jobs=jobs, stream=stream, resume=True)
+                generator.start()
+                self.assertDictEqual(self._read_cases(), files)
+                if jobs == 1:
+                    self.assertEqual(len(calls), 2)
+                    self.assertListEqual([(result.batch, result.case) for result in generator.results],
+                                         [(2, 1), (2, 2)])
+
+                # a finished run has nothing left to resume
+                calls.clear()
+                Generator(batches=batches, exe='cat', jobs=jobs, stream=stream, resume=True).start()
+                self.assertListEqual(calls, [])
+
+        # only the outputs are redone when the solution changes
+        generator = Generator(batches=batches, exe=['sh', '-c', 'cat'], resume=True)
+        generator.start()
+        self.assertListEqual(calls, [])
+        self.assertEqual(len(generator.results), 6)
+        self.assertDictEqual(self._read_cases(), files)
+
+        # a run without resume starts over
+        Generator(batches=batches, exe='cat', seed=9).start()
+        self.assertEqual(len(calls), 6)
+
+    def _read_archive(self, filename):
+        if filename.endswith('.zip'):
+            with zipfile.ZipFile(filename) as archive:
+                return {name: archive.read(name).decode() for name in archive.namelist()}
+        with tarfile.open(filename) as archive:
+            return {member.name: archive.extractfile(member).read().decode() for member in archive.getmembers()}
+
+    def test_generator_archive(self):
+        self._set_seeded_case()
+        batches = [Batch(num=1, cases=[Case() for i in range(3)]), Batch(num=2, cases=[Case()], start=1)]
+        Generator(batches=batches, exe='cat', seed=4).start()
+        files = self._read_cases()
+        shutil.rmtree(Batch.CASES_DIR)
+
+        for ext in ('zip', 'tar', 'tar.gz', 'tar.xz'):
+            for jobs, stream in ((1, False), (1, True), (2, False), (2, True)):
+                with self.subTest(ext=ext, jobs=jobs, stream=stream):
+                    filename = os.path.join(self._temp_dir.name, 'cases.' + ext)
+                    Generator(batches=batches, exe='cat', seed=4, jobs=jobs, stream=stream, archive=filename,
+                              archive_level=1, keep_cases=False).start()
+                    self.assertFalse(os.path.exists(Batch.CASES_DIR))
+                    self.assertDictEqual(self._read_archive(filename), files)
+
+        filename = os.path.join(self._temp_dir.name, 'cases.zip')
+        Generator(batches=batches, seed=4, archive=filename, archive_names='{batch}.{case}.{ext}').start()
+        self.assertDictEqual(self._read_archive(filename), {
+            name.replace('batch', '').replace('/', '.'): data for name, data in files.items() if name.endswith('.in')
+        })
+        # the cases are still written to CASES_DIR by default
+        self.assertDictEqual(self._read_cases(), {name: data for name, data in files.items() if name.endswith('.in')})
+
+        # only successful outputs are archived
+        with self.assertLogs('testcase_generator.runner', level='WARNING'):
+            Generator(batches=batches, exe=['sh', '-c', 'cat; exit 1'], seed=4, archive=filename).start()
+        self.assertListEqual(sorted(self._read_archive(filename)), ['batch1/0.in', 'batch1/1.in', 'batch1/2.in',
+                                                                    'batch2/1.in'])
+
+        # cases skipped by the cache are added from their files
+        Generator(batches=batches, exe='cat', seed=4, cache=True).start()
+        generator = Generator(batches=batches, exe='cat', seed=4, cache=True, archive=filename)
+        generator.start()
+        self.assertListEqual(generator.results, [])
+        self.assertDictEqual(self._read_archive(filename), files)
+
+        batch = Batch(num=1, cases=batches[0].cases)
+        with ArchiveWriter(filename, name_format='{case}.{ext}', keep_files=False) as archive:
+            batch.run('cat', seed=4, archive=archive)
+        self.assertListEqual(os.listdir(batch.location), [])
+        self.assertDictEqual(self._read_archive(filename), {
+            name[len('batch1/'):]: data for name, data in files.items() if name.startswith('batch1/')
+        })
+
+        with self.assertRaisesRegex(ValueError, 'An archive must be set'):
+            Generator(batches=batches, keep_cases=False).start()
+        with self.assertRaisesRegex(ValueError, 'require the cases to be kept'):
+            Generator(batches=batches, seed=4, archive=filename, keep_cases=False, cache=True).start()
+        with self.assertRaisesRegex(ValueError, 'The file name 1.in is used twice'):
+            Generator(batches=batches, archive=filename, archive_names='{case}.{ext}').start()
+        with self.assertRaisesRegex(ValueError, 'Unknown archive type'):
+            Generator(batches=batches, archive=os.path.join(self._temp_dir.name, 'cases.rar')).start()
+
+    def test_archive_level(self):
+        filename = os.path.join(self._temp_dir.name, 'data')
+        with open(filename, 'w') as f:
+            f.write('0 1\n' * 10**5)
+        sizes = []
+        for level in (0, 9):
+            archive_filename = os.path.join(self._temp_dir.name, 'cases.zip')
+            with ArchiveWriter(archive_filename, level=level) as archive:
+                archive.add(1, 0, 'in', filename)
+            sizes.append(os.path.getsize(archive_filename))
+        self.assertGreater(sizes[0], 10 * sizes[1])
+
+    def test_generator_profile(self):
+        self._set_seeded_case()
+        batches = [Batch(num=1, cases=[Case() for i in range(3)]), Batch(num=2, cases=[Case()], start=1)]
+        report_file = os.path.join(self._temp_dir.name, 'report.json')
+        for jobs, stream in ((1, False), (2, True)):
+            with self.subTest(jobs=jobs, stream=stream):
+                generator = Generator(batches=batches, exe='cat', seed=4, jobs=jobs, stream=stream, profile_slowest=2,
+                                      report_file=report_file)
+                with mock.patch('sys.stderr', new_callable=io.StringIO) as stderr:
+                    generator.start()
+                self.assertIn('Slowest cases:', stderr.getvalue())
+                with open(report_file) as f:
+                    report = json.load(f)
+                self.assertDictEqual(report, generator.report.dict())
+
+                files = self._read_cases()
+                self.assertListEqual([(case['batch'], case['case']) for case in report['cases']],
+                                     [(1, 0), (1, 1), (1, 2), (2, 1)])
+                for case in report['cases']:
+                    data = files['batch{}/{}.in'.format(case['batch'], case['case'])]
+                    self.assertEqual(case['bytes'], len(data))
+                    self.assertEqual(case['lines'], data.count('\n'))
+                    self.assertGreater(case['generate_time'], 0)
+                    self.assertGreater(case['write_time'], 0)
+                    self.assertEqual(case['solution']['returncode'], 0)
+                    self.assertGreater(case['solution']['max_rss'], 0)
+                self.assertEqual(sum(case['profile'] is not None for case in report['cases']), 2)
+                self.assertTrue(any('generate_input' in entry['function']
+                                    for case in report['cases'] if case['profile'] for entry in case['profile']))
+
+                batch = report['batches'][0]
+                self.assertEqual(batch['cases'], 3)
+                self.assertEqual(batch['lines'], sum(case['lines'] for case in report['cases'][:3]))
+                self.assertEqual(batch['solution_max_rss'],
+                                 max(case['solution']['max_rss'] for case in report['cases'][:3]))
+
+        # the profiling run does not change the files
+        Generator(batches=batches, exe='cat', seed=4).start()
+        self.assertDictEqual(self._read_cases(), files)
+        self.assertIsNone(Generator(batches=batches).report)
+
+    def test_generator_parallel_without_fork(self):
+        self._set_graph_case()
+        batches = [Batch(num=1, cases=[Case()])]
+        with mock.patch('multiprocessing.get_all_start_methods', return_value=['spawn']):
+            with self.assertRaisesRegex(ValueError, 'requires the fork start method'):
+                Generator(batches=batches, jobs=2).start()
+            Generator(batches=batches).start()
+
+    def test_batch_run_command(self):
+        self._set_graph_case()
+        batch = Batch(num=1, cases=[Case() for i in range(3)])
+        results = batch.run('cat')
+        self.assertEqual(len(results), 3)
+        for i in range(3):
+            with open(batch.filename(i) + '.in') as f_in, open(batch.filename(i) + '.out') as f_out:
+                self.assertEqual(f_in.read(), f_out.read())
+
+    def test_generator_cpu_limit(self):
+        def set_constraints(this):
+            this.N = BoundedConstraint(1, 10)
+
+        def generate_input(self, **kwargs):
+            yield self.N.next
+
+        Case.SET_CONSTRAINTS = set_constraints
+        Case.SET_INPUT = generate_input
+
+        batches = [Batch(num=1, cases=[Case()])]
+        generator = Generator(batches=batches, exe=['sh', '-c', 'while :; do :; done'], cpu_limit=0.5, timeout=20)
+        with self.assertLogs('testcase_generator.runner', level='WARNING'):
+            generator.start()
+        self.assertFalse(generator.results[0].timed_out)
+        self.assertLess(generator.results[0].returncode, 0)
+
+        # a quick solution is not reported as timed out, even if the timer is about to fire
+        generator = Generator(batches=batches, exe='true', timeout=0.05)
+        generator.start()
+        self.assertTrue(generator.results[0].ok)
@@ -1,3 +1,4 @@
+import itertools
 import os
 import tempfile
 import unittest
@@ -5,6 +6,7 @@ import unittest
 from testcase_generator import (
     Batch, BoundedConstraint, Case, ConstraintParser, NoArgumentConstraint,
 )
+from testcase_generator.expressions import compile_expression, evaluate
 
 
 class TestParser(unittest.TestCase):
@@ -69,6 +71,48 @@ class TestParser(unittest.TestCase):
         self.assertEqual(parser.batches[1].cases[0].N.max, 100)
         self.assertEqual(parser.batches[2].cases[0].M.max, 95)
 
+    def test_lazy_cases(self):
+        parser = ConstraintParser('''\
+        - batch: 1
+          cases:
+            - constraints: {N: 5}
+              repeat: 2
+            - constraints: {N: 7}
+              repeat: 1000000
+            - constraints: {}
+        ''')
+        parser.parse()
+        cases = parser.batches[0].cases
+        self.assertEqual(len(cases), 1000003)
+        self.assertListEqual([cases[i].N.min for i in (0, 1, 2, 1000001)], [5, 5, 7, 7])
+        self.assertTupleEqual(cases[-1].N.args, (1, 100))
+        self.assertIsNot(cases[0], cases[0])
+        with self.assertRaises(IndexError):
+            cases[1000003]
+        self.assertEqual(sum(1 for case in itertools.islice(cases, 10) if case.N.min == 5), 2)
+        # nothing is written until the batch is run
+        self.assertFalse(os.path.exists(Batch.CASES_DIR))
+
+    def test_expressions(self):
+        for expression, value in (('5', 5), (' MAX-1 ', 99), ('10**2', 100), ('(MIN + MAX) // 2', 50),
+                                  ('-MIN + 3 * 4 % 5', 1), ('MAX / 4', 25.0), ('+2', 2), ('2.5', 2.5)):
+            with self.subTest(expression=expression):
+                self.assertEqual(evaluate(expression, 1, 100), value)
+        for expression in ('__import__("os")', 'N', 'MAX if 1 else 2', '[1]', '1 +', 'MAX.bit_length()',
+                           '10**10**10', '"1"'):
+            with self.subTest(expression=expression):
+                with self.assertRaises(ValueError):
+                    evaluate(expression, 1, 100)
+        self.assertIs(compile_expression('MAX-1'), compile_expression('MAX-1'))
+
+        parser = ConstraintParser('''\
+        - batch: 1
+          cases:
+            - constraints: {N: MIN+2~MIN+10}
+        ''')
+        parser.parse()
+        self.assertTupleEqual(parser.batches[0].cases[0].N.args, (3, 11))
+
     def test_unsupported_constraint(self):
         with self.assertRaisesRegex(ValueError, 'The parser does not support modifiying constraint'):
             ConstraintParser('''\
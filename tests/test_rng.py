@@ -0,0 +1,37 @@
+import unittest
+
+from testcase_generator import NumpyRandom, derive_seed
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class TestRandom(unittest.TestCase):
+    def test_derive_seed(self):
+        self.assertEqual(derive_seed(1, 2, 3), derive_seed(derive_seed(1, 2), 3))
+        self.assertEqual(derive_seed(5), 5)
+        self.assertNotEqual(derive_seed(1, 2, 3), derive_seed(1, 3, 2))
+        self.assertLess(derive_seed(1, 2), 2**64)
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed.')
+    def test_numpy_random(self):
+        rng = NumpyRandom(1)
+        values = [rng.randint(1, 6) for i in range(100)]
+        self.assertSetEqual(set(values), set(range(1, 7)))
+        self.assertTrue(all(0 <= rng.random() < 1 for i in range(100)))
+        self.assertTrue(all(0 <= rng.getrandbits(70) < 2**70 for i in range(100)))
+        self.assertEqual(rng.getrandbits(0), 0)
+
+        state = rng.getstate()
+        arr = list(range(20))
+        rng.shuffle(arr)
+        self.assertListEqual(sorted(arr), list(range(20)))
+        rng.setstate(state)
+        arr2 = list(range(20))
+        rng.shuffle(arr2)
+        self.assertListEqual(arr, arr2)
+
+        self.assertListEqual([NumpyRandom(3).randint(1, 10**9) for i in range(2)],
+                             [NumpyRandom(3).randint(1, 10**9) for i in range(2)])